@@ -4,8 +4,11 @@
 # Entry point for onnx-graphsurgeon GUI web app.
 ##
 
-from bottle import route, get, post, request, run, response, static_file
+import os
 import pathlib
+import secrets
+
+from bottle import route, get, post, request, run, response, static_file
 
 from graphsurgeon_http import Model
 
@@ -35,13 +38,17 @@ def open_model():
     # Load a user-uploaded ONNX model into graphsurgeon.
     global model
     onnx_file = request.files['file']
-    model = Model.from_bytes(onnx_file.file.read())
+    model = Model.from_bytes(onnx_file.file.read(), structure_only=True)
 
 @post('/model/assign_node_ids')
 def assign_node_ids():
     # Communicate ids that will be used to address nodes when making edits.
     global model
-    model.assign_node_ids(request.json)
+    try:
+        model.assign_node_ids(request.json)
+    except RuntimeError as e:
+        response.status = 400
+        return str(e)
 
 @post('/model/edit')
 def edit_model():
@@ -49,18 +56,55 @@ def edit_model():
     # The edit is given as a json dict which we use to make the exact same edit
     # to the onnx-graphsurgeon model.
     global model
-    try:
-        model.edit(request.json)
-    except KeyError as e:
-        print("KeyError when editing model: ", e)
+    [result] = model.edit_batch([request.json])
+    if result['status'] == 'failed':
+        print("Error when editing model: ", result['error'])
+
+@post('/model/edit/batch')
+def edit_model_batch():
+    # Applies an ordered list of edits atomically: if one fails, none are applied.
+    # Responds with one result per edit so the client can tell which edit failed.
+    global model
+    results = model.edit_batch(request.json)
+    if any(result['status'] == 'failed' for result in results):
+        response.status = 400
+    return {'results': results}
+
+@post('/model/undo')
+def undo_edit():
+    # Reverts the last edit batch, cleanup or constant folding.
+    # The client reloads the model from /model/save if something was undone.
+    global model
+    return {'undone': model.undo()}
+
+@post('/model/redo')
+def redo_edit():
+    global model
+    return {'redone': model.redo()}
+
+@get('/model/blocks')
+def repeated_blocks():
+    # Node ids of repeated structural blocks for API clients, the bundled viewer does not
+    # collapse them.
+    global model
+    return {'blocks': model.repeated_blocks()}
 
 @get('/model/save')
 def save_model():
     # Serve the saved graphsurgeon graph as a file which the client can download.
+    # The file is exported once per model change and streamed from a temp file of the session,
+    # which stays readable while a concurrent save replaces it.
+    # Models over 2 GB are sent as a zip archive with the weights in an external data file.
     global model
-    tmp_filename = '/tmp/modified.onnx'
-    model.save_to_file(tmp_filename)
-    return static_file(tmp_filename, root='/')
+    session = request.get_cookie('session')
+    if not session:
+        session = secrets.token_hex(16)
+        response.set_cookie('session', session, path='/', httponly=True)
+    file = model.save(session)
+    archive = file.name.endswith('.zip')
+    response.content_type = 'application/zip' if archive else 'application/octet-stream'
+    response.content_length = os.fstat(file.fileno()).st_size
+    return file
 
 @get('/model/cleanup')
 def cleanup_model():
@@ -5,70 +5,425 @@
 # using onnx-graphsurgeon via a JSON API.
 ##
 
-from typing import Dict, Any
+from typing import Any, BinaryIO, Callable, Dict, List, Optional
+import collections
+import mmap
+import os
+import shutil
+import tempfile
+import threading
+import weakref
+import zipfile
 
 import onnx
 import onnx_graphsurgeon as gs
+from onnx_graphsurgeon.ir.tensor import LazyValues
 
 import numpy as np
 
+from source import onnx_
+
+class ExternalValues(LazyValues):
+    '''
+    Lazily loaded constant values whose payload was skipped by a structure-only load.
+    '''
+    def __init__(self, tensor: onnx.TensorProto, model: "Model"):
+        super().__init__(tensor)
+        self.model = model
+
+    def load(self):
+        return np.array(onnx.numpy_helper.to_array(self.model.resolve_tensor(self.tensor)))
+
 class Model:
 
-    def __init__(self, model: gs.Graph):
+    def __init__(self, model: gs.Graph, source=None, location: str = '', base_dir: str = ''):
         self.model: gs.Graph = model
 
+        # Buffer which payloads of tensors with external data location
+        # `location` are sliced from, None if all weights were decoded.
+        self.source = source
+        self.location = location
+        self.base_dir = base_dir
+        for tensor in model.tensors().values():
+            if isinstance(tensor, gs.Constant) and type(tensor._values) is LazyValues and \
+               onnx.external_data_helper.uses_external_data(tensor._values.tensor):
+                tensor._values = ExternalValues(tensor._values.tensor, self)
+                # Values are exported inline once loaded.
+                tensor.data_location = None
+
         # Mapping of ID -> Node used to address nodes.
         # Should be populated by client with assign_node_ids().
         self.nodes: Dict[int, gs.Node] = {id: node for id, node in enumerate(model.nodes)}
 
+        # Mapping of name -> Tensor, built once and updated by each edit.
+        # Producers and consumers are kept in sync by graphsurgeon as tensor.inputs/outputs.
+        self.tensors: Dict[str, gs.Tensor] = model.tensors()
+
+        # Mapping of id(node) -> index in model.nodes when it was last built. Each node
+        # insert or removal since then moves a node by at most one, counted in positions_drift.
+        self.positions: Dict[int, int] = {}
+        self.positions_drift = 0
+
+        # Journal of applied edit batches and checkpoints, entries before journal_index
+        # are applied and entries after it can be redone.
+        self.journal: List[Dict[str, Any]] = []
+        self.journal_index = 0
+
+        # Counts changes to the graph, exports are reused while it is unchanged.
+        # Mapping of session -> (revision, path) of its last export, oldest first.
+        self.revision = 0
+        self.exports: collections.OrderedDict = collections.OrderedDict()
+        self.exports_count = 0
+        self.exports_lock = threading.Lock()
+        self.directory: Optional[str] = None
+
         # TODO: do we need a lock?
 
+    # Checkpoints hold a copy of the graph structure (weights are shared), keep a few.
+    max_journal = 1000
+    max_checkpoints = 8
+
+    # Protobuf messages are limited to 2 GB, larger models are saved with external data.
+    max_inline_size = (1 << 31) - (1 << 26)
+
+    # Sessions which keep an export file, the least recently saved one is dropped.
+    max_sessions = 16
+
     ################ Constructors
     @classmethod
-    def from_file(cls, filepath: str) -> "Model":
-        return Model(gs.import_onnx(onnx.load(filepath)))
-    
+    def from_file(cls, filepath: str, structure_only: bool = False) -> "Model":
+        if not structure_only:
+            return Model(gs.import_onnx(onnx.load(filepath)))
+        # Weights stay in the page cache and are read by offset when accessed.
+        with open(filepath, 'rb') as file:
+            source = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        location = os.path.basename(filepath)
+        base_dir = os.path.dirname(os.path.abspath(filepath))
+        model = onnx_.load(source, location)
+        return Model(gs.import_onnx(model), source, location, base_dir)
+
     @classmethod
-    def from_bytes(cls, bytes: bytes) -> "Model":
-        return Model(gs.import_onnx(onnx.load_model_from_string(bytes)))
+    def from_bytes(cls, bytes: bytes, structure_only: bool = False) -> "Model":
+        if not structure_only:
+            return Model(gs.import_onnx(onnx.load_model_from_string(bytes)))
+        # Payloads are sliced from the uploaded buffer instead of being copied by protobuf.
+        location = ':memory:'
+        return Model(gs.import_onnx(onnx_.load(bytes, location)), bytes, location)
+
+    def resolve_tensor(self, tensor: onnx.TensorProto) -> onnx.TensorProto:
+        '''
+        Returns a copy of tensor with its external payload loaded into raw_data.
+        '''
+        resolved = onnx.TensorProto()
+        resolved.CopyFrom(tensor)
+        entries = {entry.key: entry.value for entry in tensor.external_data}
+        if self.source is not None and entries.get('location') == self.location:
+            offset = int(entries['offset'])
+            resolved.raw_data = self.source[offset:offset + int(entries['length'])]
+        else:
+            onnx.external_data_helper.load_external_data_for_tensor(resolved, self.base_dir)
+        del resolved.external_data[:]
+        resolved.data_location = onnx.TensorProto.DEFAULT
+        return resolved
+
+    def _export(self) -> onnx.ModelProto:
+        return self._inline(gs.export_onnx(self.model))
+
+    def _inline(self, model: onnx.ModelProto) -> onnx.ModelProto:
+        for tensor in model.graph.initializer:
+            if onnx.external_data_helper.uses_external_data(tensor):
+                tensor.CopyFrom(self.resolve_tensor(tensor))
+        return model
 
     ################ Setup / Initialization
     def assign_node_ids(self, id_mapping_json):
+        '''
+        Maps client IDs to nodes by structural fingerprint (op, input names, output names).
+
+        Each entry is first checked against the node its ID mapped to before and the node at
+        its position, so after a reload or cleanup/fold_constants only nodes which moved or
+        changed are looked up in a fingerprint index. Equal fingerprints resolve in position
+        order. Nodes the client does not show (e.g. Constant nodes shown as initializers)
+        stay unmapped. Throws RuntimeError listing the client nodes without a match.
+        '''
+        nodes = self.model.nodes
+        previous = self.nodes
         self.nodes = dict()
-        json_node_idx = 0
-        for node in self.model.nodes:
-            [node_id, op_type, node_inputs, node_outputs] = id_mapping_json[json_node_idx]
-            gs_node_inputs = [tensor.name for tensor in node.inputs]
-            gs_node_outputs = [tensor.name for tensor in node.outputs]
-            if node.op == op_type and \
-               node_inputs == gs_node_inputs and \
-               node_outputs == gs_node_outputs:
-                self.nodes[node_id] = node
-                json_node_idx += 1
-        if len(self.nodes) != len(id_mapping_json):
-            raise RuntimeError(f'Only found {len(self.nodes)} matching nodes ' +\
-                f'out of the required {len(id_mapping_json)}.')
+        claimed = set()
+        remaining = []
+        for position, [node_id, op_type, node_inputs, node_outputs] in enumerate(id_mapping_json):
+            fingerprint = (op_type, tuple(node_inputs), tuple(node_outputs))
+            candidates = (previous.get(node_id), nodes[position] if position < len(nodes) else None)
+            for node in candidates:
+                if node is not None and id(node) not in claimed and \
+                   self._fingerprint(node) == fingerprint:
+                    self.nodes[node_id] = node
+                    claimed.add(id(node))
+                    break
+            else:
+                remaining.append((node_id, fingerprint))
+        if not remaining:
+            return
+
+        index = dict()
+        for node in nodes:
+            if id(node) not in claimed:
+                index.setdefault(self._fingerprint(node), collections.deque()).append(node)
+        unmatched = []
+        for node_id, fingerprint in remaining:
+            if index.get(fingerprint):
+                self.nodes[node_id] = index[fingerprint].popleft()
+            else:
+                unmatched.append(node_id)
+        if unmatched:
+            mapping = {entry[0]: entry for entry in id_mapping_json}
+            details = '; '.join(f'{node_id}: {op_type} {inputs} -> {outputs}'
+                for node_id, op_type, inputs, outputs in (mapping[_] for _ in unmatched[:10]))
+            raise RuntimeError(f'No matching node for {len(unmatched)} of the ' + \
+                f'{len(id_mapping_json)} client nodes: {details}' + \
+                ('; ...' if len(unmatched) > 10 else ''))
+
+    @staticmethod
+    def _fingerprint(node: gs.Node):
+        return (node.op,
+            tuple(tensor.name for tensor in node.inputs),
+            tuple(tensor.name for tensor in node.outputs))
+
+
+    ################ Structure
+    def producers(self, name: str):
+        return list(self.tensors[name].inputs)
+
+    def consumers(self, name: str):
+        return list(self.tensors[name].outputs)
+
+    def _tensor(self, name: str) -> gs.Tensor:
+        '''
+        Returns the tensor with this name, creating and indexing a new variable if none exists.
+        '''
+        tensor = self.tensors.get(name)
+        if tensor is None:
+            tensor = gs.Variable(name=name, dtype=np.float32)
+            self.tensors[name] = tensor
+        return tensor
 
+    def _release(self, tensor: gs.Tensor):
+        '''
+        Removes a tensor from the index once no node or model input/output references it.
+        '''
+        if not tensor.inputs and not tensor.outputs and \
+           tensor not in self.model.inputs and tensor not in self.model.outputs and \
+           self.tensors.get(tensor.name) is tensor:
+            del self.tensors[tensor.name]
+
+    def repeated_blocks(self):
+        '''
+        Finds runs of structurally identical consecutive node blocks, e.g. transformer layers.
+
+        Returns a list of {'length', 'count', 'instances'} dicts where each instance is
+        the list of node ids of one repetition.
+        '''
+        from source import blocks
+        nodes = self.model.nodes
+        node_ids = {id(node): node_id for node_id, node in self.nodes.items()}
+        positions = {id(node): index for index, node in enumerate(nodes)}
+        tokens = []
+        for index, node in enumerate(nodes):
+            inputs = []
+            for tensor in node.inputs:
+                if isinstance(tensor, gs.Constant):
+                    inputs.append(-1)
+                elif not tensor.inputs or id(tensor.inputs[0]) not in positions:
+                    inputs.append(-2)
+                elif len(tensor.outputs) > 2:
+                    # Shared tensors like masks are consumed by every block at varying distance.
+                    inputs.append(-3)
+                else:
+                    inputs.append(index - positions[id(tensor.inputs[0])])
+            attrs = tuple(sorted((name, repr(value)) for name, value in node.attrs.items()))
+            tokens.append(hash((node.op, node.domain, tuple(inputs), len(node.outputs), attrs)))
+        result = []
+        for start, length, count in blocks.find(tokens):
+            instances = []
+            for first in range(start, start + length * count, length):
+                instances.append([node_ids.get(id(node)) for node in nodes[first:first + length]])
+            result.append({'length': length, 'count': count, 'instances': instances})
+        return result
 
     ################ Serialization & Saving
     def to_bytes(self) -> bytes:
-        return gs.export_onnx(self.model).SerializeToString()
-    
+        return self._export().SerializeToString()
+
     def save_to_file(self, filepath):
-        onnx.save(gs.export_onnx(self.model), filepath)
+        onnx.save(self._export(), filepath)
+
+    def save(self, session: str = '') -> BinaryIO:
+        '''
+        Exports the model to a file in a temporary directory owned by this model and returns
+        it opened for reading.
+
+        Each session has its own file, which is replaced once the model changed. Sessions
+        saving the same revision share one export through hard links. A replaced file is
+        unlinked, downloads which opened it keep reading it. Models larger than
+        max_inline_size are saved as a zip archive of model.onnx with its initializers
+        in model.onnx.data, copied one tensor at a time.
+        '''
+        with self.exports_lock:
+            export = self.exports.pop(session, None)
+            if export is not None and export[0] != self.revision:
+                os.remove(export[1])
+                export = None
+            if export is None:
+                revision = self.revision
+                export = (revision, self._save(revision))
+            self.exports[session] = export
+            while len(self.exports) > self.max_sessions:
+                _, (_, path) = self.exports.popitem(last=False)
+                os.remove(path)
+            return open(export[1], 'rb')
+
+    def _save(self, revision: int) -> str:
+        if self.directory is None:
+            self.directory = tempfile.mkdtemp(prefix='onnx-graphsurgeon-')
+            weakref.finalize(self, shutil.rmtree, self.directory, True)
+        self.exports_count += 1
+        name = os.path.join(self.directory, 'export-' + str(self.exports_count))
+        for export in self.exports.values():
+            if export[0] == revision:
+                path = name + os.path.splitext(export[1])[1]
+                try:
+                    os.link(export[1], path)
+                except OSError:
+                    shutil.copyfile(export[1], path)
+                return path
+        model = gs.export_onnx(self.model)
+        size = model.ByteSize()
+        for tensor in model.graph.initializer:
+            if onnx.external_data_helper.uses_external_data(tensor):
+                entries = {entry.key: entry.value for entry in tensor.external_data}
+                size += int(entries.get('length', 0))
+        archive = size > self.max_inline_size
+        path = name + ('.zip' if archive else '.onnx')
+        with open(path, 'xb') as file:
+            try:
+                if archive:
+                    self._save_archive(model, file)
+                else:
+                    file.write(self._inline(model).SerializeToString())
+            except BaseException:
+                file.close()
+                os.remove(path)
+                raise
+        return path
+
+    def _save_archive(self, model: onnx.ModelProto, file):
+        location = 'model.onnx.data'
+        with zipfile.ZipFile(file, 'w', zipfile.ZIP_STORED, allowZip64=True) as archive:
+            offset = 0
+            with archive.open(location, 'w', force_zip64=True) as data:
+                for tensor in model.graph.initializer:
+                    if onnx.external_data_helper.uses_external_data(tensor):
+                        tensor.CopyFrom(self.resolve_tensor(tensor))
+                    elif len(tensor.raw_data) < 1024:
+                        continue
+                    data.write(tensor.raw_data)
+                    length = len(tensor.raw_data)
+                    onnx.external_data_helper.set_external_data(tensor, location, offset, length)
+                    tensor.ClearField('raw_data')
+                    offset += length
+            archive.writestr('model.onnx', model.SerializeToString())
 
     ################ Advanced Graphsurgeon Edits.
     def cleanup(self):
-        self.model.cleanup()
+        self._checkpoint('cleanup', lambda graph: graph.cleanup())
 
     def fold_constants(self):
-        self.model.fold_constants(error_ok=False)
+        self._checkpoint('fold_constants', lambda graph: graph.fold_constants(error_ok=False))
+
+    def _checkpoint(self, name: str, operation: Callable[[gs.Graph], Any]):
+        '''
+        Runs a non-invertible operation on a copy of the graph and journals a checkpoint.
+
+        The original graph is left untouched, so undo swaps it back in O(1) and journaled
+        edits before the checkpoint still refer to its nodes and tensors.
+        '''
+        self.revision += 1
+        graph = self.model.copy()
+        graph.producer_name = self.model.producer_name
+        graph.producer_version = self.model.producer_version
+        # Copies keep the node order.
+        copies = {id(node): copy for node, copy in zip(self.model.nodes, graph.nodes)}
+        operation(graph)
+        remaining = set(map(id, graph.nodes))
+        nodes = {}
+        for node_id, node in self.nodes.items():
+            copy = copies.get(id(node))
+            if copy is not None and id(copy) in remaining:
+                nodes[node_id] = copy
+        swap = self._swap_state(graph, nodes, graph.tensors())
+        self._record({'checkpoint': name, 'inverses': [swap()]})
+
+    def _swap_state(self, graph: gs.Graph, nodes: Dict[int, gs.Node],
+                    tensors: Dict[str, gs.Tensor]):
+        def swap():
+            inverse = self._swap_state(self.model, self.nodes, self.tensors)
+            self.model, self.nodes, self.tensors = graph, nodes, tensors
+            self.positions = {}
+            return inverse
+        return swap
+
+    ################ Undo / Redo
+    def undo(self) -> Optional[Dict[str, Any]]:
+        '''
+        Reverts the last applied edit batch or checkpoint.
+
+        Returns the journal entry without its inverses, or None if there is nothing to undo.
+        '''
+        if self.journal_index == 0:
+            return None
+        self.revision += 1
+        self.journal_index -= 1
+        entry = self.journal[self.journal_index]
+        inverses = entry['inverses']
+        for i in reversed(range(len(inverses))):
+            if inverses[i] is not None:
+                inverses[i] = inverses[i]()
+        return {key: value for key, value in entry.items() if key != 'inverses'}
+
+    def redo(self) -> Optional[Dict[str, Any]]:
+        '''
+        Re-applies the last undone edit batch or checkpoint.
+
+        Returns the journal entry without its inverses, or None if there is nothing to redo.
+        '''
+        if self.journal_index == len(self.journal):
+            return None
+        self.revision += 1
+        entry = self.journal[self.journal_index]
+        self.journal_index += 1
+        inverses = entry['inverses']
+        for i in range(len(inverses)):
+            if inverses[i] is not None:
+                inverses[i] = inverses[i]()
+        return {key: value for key, value in entry.items() if key != 'inverses'}
+
+    def _record(self, entry: Dict[str, Any]):
+        del self.journal[self.journal_index:]
+        self.journal.append(entry)
+        if 'checkpoint' in entry:
+            checkpoints = [i for i, other in enumerate(self.journal) if 'checkpoint' in other]
+            if len(checkpoints) > self.max_checkpoints:
+                del self.journal[:checkpoints[0] + 1]
+        del self.journal[:-self.max_journal]
+        self.journal_index = len(self.journal)
 
     ############### Basic Graphsurgeon Edits.
-    def edit(self, edit_json: Dict[str, Any]):
+    def edit(self, edit_json: Dict[str, Any]) -> Optional[Callable[[], Any]]:
         '''
         General edit methods which dispatches to helper methods.
 
+        Returns the inverse of the edit, or None if the edit changed nothing. Calling an
+        inverse reverts the edit and returns the inverse which re-applies it.
         Throws KeyError if edit_json['action'] does not exist or is not valid.
         '''
         action_handlers = {
@@ -102,18 +457,139 @@ class Model:
             'change_model_input_output': self._change_model_input_output,
         }
         action_name = edit_json['action']
+        self.revision += 1
         return action_handlers[action_name](edit_json)
-    
+
+    def edit_batch(self, edits_json: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        '''
+        Applies a list of edits in order as a single transaction and journals it for undo.
+
+        If an edit fails, the edits before it are reverted in reverse order so the graph is
+        left unchanged. Returns one {'status'} dict per edit: 'applied', 'failed' (with an
+        'error' message), 'reverted' for edits undone because of the failure, or 'skipped'.
+        '''
+        results = []
+        inverses = []
+        for edit_json in edits_json:
+            try:
+                inverses.append(self.edit(edit_json))
+                results.append({'status': 'applied'})
+            except Exception as e:
+                results.append({'status': 'failed', 'error': f'{type(e).__name__}: {e}'})
+                break
+        else:
+            if any(inverse is not None for inverse in inverses):
+                self._record({'edits': edits_json, 'inverses': inverses})
+            return results
+        for inverse in reversed(inverses):
+            if inverse is not None:
+                inverse()
+        for result in results[:-1]:
+            result['status'] = 'reverted'
+        results.extend({'status': 'skipped'} for _ in range(len(edits_json) - len(results)))
+        return results
+
     def _get_node_by_id(self, node_id):
         return self.nodes[node_id]
 
+    def _position(self, node: gs.Node) -> int:
+        nodes = self.model.nodes
+        position = self.positions.get(id(node))
+        drift = self.positions_drift
+        # Searching a window around the last known index is cheaper than a rebuild
+        # until about sqrt(len(nodes)) edits have accumulated.
+        if position is not None and drift * drift <= max(len(nodes), 4096):
+            start = max(position - drift, 0)
+            for index, other in enumerate(nodes[start:position + drift + 1], start):
+                # By identity, gs.Node compares equal to other nodes with the same structure.
+                if other is node:
+                    return index
+        self.positions = dict(zip(map(id, nodes), range(len(nodes))))
+        self.positions_drift = 0
+        return self.positions[id(node)]
+
+    # Inverses capture nodes and tensors rather than IDs, which the client reassigns on reload.
+    # Each one returns its own inverse, so the journal can undo and redo without replaying JSON.
+    @staticmethod
+    def _swap_attrs(node: gs.Node, attrs: Dict[str, Any]):
+        def swap():
+            # Attribute dicts are small, restoring a copy also restores the key order.
+            inverse = Model._swap_attrs(node, dict(node.attrs))
+            node.attrs.clear()
+            node.attrs.update(attrs)
+            return inverse
+        return swap
+
+    @staticmethod
+    def _swap_value(obj: Any, name: str, value: Any):
+        def swap():
+            inverse = Model._swap_value(obj, name, getattr(obj, name))
+            setattr(obj, name, value)
+            return inverse
+        return swap
+
+    def _insert_node(self, node_id: int, node: gs.Node, index: int,
+                     inputs: List[gs.Tensor], outputs: List[gs.Tensor]):
+        def insert():
+            self.model.nodes.insert(index, node)
+            self.positions_drift += 1
+            self.nodes[node_id] = node
+            node.inputs.extend(inputs)
+            node.outputs.extend(outputs)
+            for tensor in inputs + outputs:
+                self.tensors.setdefault(tensor.name, tensor)
+            return self._pop_node(node_id, index)
+        return insert
+
+    def _pop_node(self, node_id: int, index: int):
+        def pop():
+            node = self.model.nodes.pop(index)
+            self.positions_drift += 1
+            if self.nodes.get(node_id) is node:
+                del self.nodes[node_id]
+
+            # Detach so the node no longer shows up as producer or consumer.
+            inputs = list(node.inputs)
+            outputs = list(node.outputs)
+            node.inputs.clear()
+            node.outputs.clear()
+            for tensor in inputs + outputs:
+                self._release(tensor)
+            return self._insert_node(node_id, node, index, inputs, outputs)
+        return pop
+
+    def _insert_tensor(self, io_list: List[gs.Tensor], index: int, tensor: gs.Tensor):
+        def insert():
+            io_list.insert(index, tensor)
+            self.tensors.setdefault(tensor.name, tensor)
+            return self._pop_tensor(io_list, index)
+        return insert
+
+    def _pop_tensor(self, io_list: List[gs.Tensor], index: int):
+        def pop():
+            tensor = io_list.pop(index)
+            self._release(tensor)
+            return self._insert_tensor(io_list, index, tensor)
+        return pop
+
+    def _swap_tensor(self, io_list: List[gs.Tensor], index: int, tensor: gs.Tensor):
+        def swap():
+            old_tensor = io_list[index]
+            io_list[index] = tensor
+            self.tensors.setdefault(tensor.name, tensor)
+            self._release(old_tensor)
+            return self._swap_tensor(io_list, index, old_tensor)
+        return swap
+
     def _change_attr_name(self, edit_json: Dict[str, Any]):
         node_id = edit_json['node_id']
         attr_name = edit_json['attr_name']
         new_name = edit_json['new_name']
 
         node = self._get_node_by_id(node_id)
+        inverse = self._swap_attrs(node, dict(node.attrs))
         node.attrs[new_name] = node.attrs.pop(attr_name)
+        return inverse
 
     def _change_attr_value(self, edit_json: Dict[str, Any]):
         node_id = edit_json['node_id']
@@ -121,7 +597,9 @@ class Model:
         new_value = edit_json['new_value']
 
         node = self._get_node_by_id(node_id)
+        inverse = self._swap_attrs(node, dict(node.attrs))
         node.attrs[attr_name] = new_value
+        return inverse
 
     def _change_attr_type(self, edit_json: Dict[str, Any]):
         # TODO
@@ -134,14 +612,18 @@ class Model:
         attr_type = edit_json['attr_type'] # FIXME unused
 
         node = self._get_node_by_id(node_id)
+        inverse = self._swap_attrs(node, dict(node.attrs))
         node.attrs[attr_name] = attr_value
+        return inverse
 
     def _remove_attr(self, edit_json: Dict[str, Any]):
         node_id = edit_json['node_id']
         attr_name = edit_json['attr_name']
 
         node = self._get_node_by_id(node_id)
+        inverse = self._swap_attrs(node, dict(node.attrs))
         del node.attrs[attr_name]
+        return inverse
 
     def _add_node(self, edit_json: Dict[str, Any]):
         node_id   = edit_json['node_id']
@@ -149,27 +631,26 @@ class Model:
         node_op   = edit_json['node_op']
 
         node = gs.Node(node_op, node_name)
-        self.model.nodes.append(node)
-        self.nodes[node_id] = node
+        return self._insert_node(node_id, node, len(self.model.nodes), [], [])()
 
     def _remove_node(self, edit_json: Dict[str, Any]):
         node_id = edit_json['node_id']
-        node = self.nodes.pop(node_id)
-        self.model.nodes.remove(node)
+        node = self.nodes[node_id]
+        return self._pop_node(node_id, self._position(node))()
 
     def _change_node_name(self, edit_json: Dict[str, Any]):
         node_id  = edit_json['node_id']
         new_name = edit_json['new_name']
 
         node = self.nodes[node_id]
-        node.name = new_name
+        return self._swap_value(node, 'name', new_name)()
 
     def _change_node_op(self, edit_json: Dict[str, Any]):
         node_id = edit_json['node_id']
         new_op  = edit_json['new_op']
 
         node = self.nodes[node_id]
-        node.op = new_op
+        return self._swap_value(node, 'op', new_op)()
 
     def _change_node_description(self, edit_json: Dict[str, Any]):
         # onnx-graphsurgeon doesn't have node descriptions.
@@ -183,9 +664,7 @@ class Model:
         node = self.nodes[node_id]
         io_list = node.inputs if is_input else node.outputs
 
-        tensors = self.model.tensors()
-        new_tensor = tensors.get(io_name, gs.Variable(name=io_name, dtype=np.float32))
-        io_list.append(new_tensor)
+        return self._insert_tensor(io_list, len(io_list), self._tensor(io_name))()
 
     def _remove_node_input_output(self, edit_json: Dict[str, Any]):
         node_id  = edit_json['node_id']
@@ -195,13 +674,10 @@ class Model:
         node = self.nodes[node_id]
         io_list = node.inputs if is_input else node.outputs
 
-        tensors = self.model.tensors()
         for i in range(len(io_list)):
             if io_list[i].name == io_name:
-                io_list.pop(i)
-                break
-        else:
-            raise ValueError(f'No tensor with name {io_name}')
+                return self._pop_tensor(io_list, i)()
+        raise ValueError(f'No tensor with name {io_name}')
 
 
     def _change_node_input_output(self, edit_json: Dict[str, Any]):
@@ -213,52 +689,44 @@ class Model:
         node = self.nodes[node_id]
         io_list = node.inputs if is_input else node.outputs
 
-        tensors = self.model.tensors()
-        new_tensor = tensors.get(new_name, gs.Variable(new_name, dtype=np.float32))
         for i, old_tensor in enumerate(io_list):
             if old_tensor.name == old_name:
-                io_list[i] = new_tensor
-                break
-        else:
-            raise ValueError(f'No tensor with name {old_name}')
+                return self._swap_tensor(io_list, i, self._tensor(new_name))()
+        raise ValueError(f'No tensor with name {old_name}')
 
 
     def _change_model_opset(self, edit_json: Dict[str, Any]):
         opset = edit_json['opset']
         try:
-            self.model.opset = int(opset)
+            return self._swap_value(self.model, 'opset', int(opset))()
         except ValueError as e:
             print("Failed to cast opset to int: ", e)
+            return None
 
     def _change_model_producer(self, edit_json: Dict[str, Any]):
         # Producer is not supported by onnx-graphsurgeon
         pass
 
     def _change_model_description(self, edit_json: Dict[str, Any]):
-        self.model.doc_string = edit_json['description']
+        return self._swap_value(self.model, 'doc_string', edit_json['description'])()
 
     def _add_model_input_output(self, edit_json: Dict[str, Any]):
         io_name  = edit_json['io_name']
         is_input = edit_json['input_or_output'] == 'input'
 
-        tensors = self.model.tensors()
         io_list = self.model.inputs if is_input else self.model.outputs
 
-        new_tensor = tensors.get(io_name, gs.Variable(name=io_name, dtype=np.float32))
-        io_list.append(new_tensor)
+        return self._insert_tensor(io_list, len(io_list), self._tensor(io_name))()
 
     def _remove_model_input_output(self, edit_json: Dict[str, Any]):
         io_name  = edit_json['io_name']
         is_input = edit_json['input_or_output'] == 'input'
 
         io_list = self.model.inputs if is_input else self.model.outputs
-        tensors = self.model.tensors()
         for i in range(len(io_list)):
             if io_list[i].name == io_name:
-                io_list.pop(i)
-                break
-        else:
-            raise ValueError(f'No tensor with name {io_name}')
+                return self._pop_tensor(io_list, i)()
+        raise ValueError(f'No tensor with name {io_name}')
 
     def _change_model_input_output(self, edit_json: Dict[str, Any]):
         old_name = edit_json['old_name']
@@ -267,12 +735,8 @@ class Model:
 
         io_list = self.model.inputs if is_input else self.model.outputs
 
-        tensors = self.model.tensors()
-        new_tensor = tensors.get(new_name, gs.Variable(new_name, dtype=np.float32))
         for i, old_tensor in enumerate(io_list):
             print(old_tensor.name)
             if old_tensor.name == old_name:
-                io_list[i] = new_tensor
-                break
-        else:
-            raise ValueError(f'No tensor with name {old_name}')
+                return self._swap_tensor(io_list, i, self._tensor(new_name))()
+        raise ValueError(f'No tensor with name {old_name}')
@@ -1,5 +1,6 @@
 ''' Python Server publish script '''
 
+import gzip
 import json
 import os
 import re
@@ -28,6 +29,16 @@ def _update(path, regex, value):
     content = re.sub(regex, repl, content)
     _write(path, content)
 
+def _compress(path):
+    ''' Write precompressed .gz variants of static assets served by the Python server '''
+    for name in os.listdir(path):
+        if os.path.splitext(name)[1] in ('.js', '.json', '.css'):
+            filename = os.path.join(path, name)
+            with open(filename, 'rb') as file:
+                data = file.read()
+            with open(filename + '.gz', 'wb') as file:
+                file.write(gzip.compress(data, 9))
+
 def _build():
     ''' Build dist/pypi '''
     shutil.rmtree(os.path.join(source_dir, '__pycache__'), ignore_errors=True)
@@ -36,6 +47,7 @@ def _build():
     shutil.copyfile(os.path.join(publish_dir, 'setup.py'), os.path.join(dist_pypi_dir, 'setup.py'))
     os.remove(os.path.join(dist_pypi_dir, 'netron', 'electron.js'))
     os.remove(os.path.join(dist_pypi_dir, 'netron', 'app.js'))
+    _compress(os.path.join(dist_pypi_dir, 'netron'))
 
 def _install():
     ''' Install dist/pypi '''
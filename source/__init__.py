@@ -9,17 +9,27 @@ from .server import stop
 from .server import status
 from .server import wait
 from .server import serve
+from .server import update
+from .server import add_model
+from .server import remove_model
+from .server import list_models
+from .server import export
 from .server import __version__
 
 def main():
     ''' main entry point '''
+    if len(sys.argv) > 1 and sys.argv[1] == 'export':
+        sys.exit(_export(sys.argv[2:]))
     parser = argparse.ArgumentParser(
-        description='Viewer for neural network, deep learning and machine learning models.')
+        description='Viewer for neural network, deep learning and machine learning models.',
+        epilog="Run 'netron export -h' for batch conversion.")
     parser.add_argument('file',
         metavar='MODEL_FILE', help='model file to serve', nargs='?', default=None)
     parser.add_argument('-b', '--browse', help='launch web browser', action='store_true')
     parser.add_argument('-p', '--port', help='port to serve', type=int)
     parser.add_argument('--host', metavar='ADDR', help='host to serve', default='localhost')
+    parser.add_argument('--engine', help='server engine (threading, asyncio)',
+        choices=[ 'threading', 'asyncio' ], default='threading')
     parser.add_argument('--verbosity',
         metavar='LEVEL', help='output verbosity (quiet, default, debug)',
         choices=[ 'quiet', 'default', 'debug', '0', '1', '2' ], default='default')
@@ -32,9 +42,29 @@ def main():
         print(__version__)
         sys.exit(0)
     address = (args.host, args.port) if args.host else args.port if args.port else None
-    start(args.file, address=address, browse=args.browse, verbosity=args.verbosity)
+    start(args.file, address=address, browse=args.browse, verbosity=args.verbosity,
+        engine=args.engine)
     wait()
     sys.exit(0)
 
+def _export(argv):
+    parser = argparse.ArgumentParser(prog='netron export',
+        description='Convert models to viewer JSON in parallel, also filling the conversion cache.')
+    parser.add_argument('paths',
+        metavar='PATH', help='model files or directories to convert', nargs='+')
+    parser.add_argument('-j', '--jobs', help='number of worker processes', type=int)
+    parser.add_argument('-o', '--output', metavar='DIR', help='directory to write .netron files')
+    parser.add_argument('--timeout', metavar='SECONDS', help='time limit per model',
+        type=float, default=600)
+    parser.add_argument('--memory', metavar='MB', help='memory limit per worker process',
+        type=int)
+    parser.add_argument('--verbosity',
+        metavar='LEVEL', help='output verbosity (quiet, default, debug)',
+        choices=[ 'quiet', 'default', 'debug', '0', '1', '2' ], default='default')
+    args = parser.parse_args(argv)
+    memory = args.memory * 1024 * 1024 if args.memory else None
+    results = export(args.paths, args.output, args.jobs, args.timeout, memory, args.verbosity)
+    return 1 if any('error' in _ for _ in results) else 0
+
 if __name__ == '__main__':
     main()
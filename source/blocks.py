@@ -0,0 +1,37 @@
+''' Repeated block detection '''
+
+import numpy # pylint: disable=import-error
+
+def find(tokens, min_length=4, candidates=8): # pylint: disable=too-many-locals
+    ''' Find runs of structurally identical consecutive blocks in a sequence of node tokens.
+
+    Tokens are structural hashes of nodes in topological order. Candidate block lengths are
+    the most frequent distances between equal tokens, each candidate is verified with one
+    vectorized comparison of the sequence against itself shifted by the block length.
+    Returns non-overlapping (start, length, count) tuples ordered by start.
+    '''
+    tokens = numpy.asarray(tokens, dtype=numpy.int64)
+    if len(tokens) < 2 * min_length:
+        return []
+    indices = numpy.argsort(tokens, kind='stable')
+    same = tokens[indices[1:]] == tokens[indices[:-1]]
+    distances = (indices[1:] - indices[:-1])[same]
+    distances = distances[distances >= min_length]
+    if len(distances) == 0:
+        return []
+    lengths, counts = numpy.unique(distances, return_counts=True)
+    lengths = lengths[numpy.argsort(-counts * lengths, kind='stable')[:candidates]]
+    runs = []
+    for length in lengths.tolist():
+        equal = numpy.concatenate(([ False ], tokens[:-length] == tokens[length:], [ False ]))
+        changes = numpy.flatnonzero(equal[1:] != equal[:-1])
+        for start, end in zip(changes[0::2].tolist(), changes[1::2].tolist()):
+            count = (end - start + length) // length
+            if count > 1:
+                runs.append(((count - 1) * length, start, length, count))
+    result = []
+    for _, start, length, count in sorted(runs, key=lambda _: (-_[0], _[1])):
+        end = start + length * count
+        if all(end <= first or start >= last for first, _, last in result):
+            result.append((start, length, end))
+    return sorted((start, length, (end - start) // length) for start, length, end in result)
@@ -7,6 +7,10 @@ client.Client = class {
 
     constructor() {
         this.connected = false;
+        this._edits = [];
+        this._sent = Promise.resolve();
+        // Called with the error when the server reverted a batch of edits, set by the view.
+        this.on_revert = null;
         this.connect();
     }
 
@@ -37,36 +41,47 @@ client.Client = class {
         // IDs stored as [id, node.type.name, node.inputs, node.outputs].
         const id_mapping = [];
 
-        const get_name = (x) => { return x.arguments[0].name };
+        // Variadic inputs and outputs hold several arguments in one parameter.
+        const get_names = (x) => x.arguments.map((argument) => argument.name);
 
         const node_ids = [];
         let id = 0;
         for (const node of nodes) {
             node.unique_id = id;
             node_ids.push(id);
-            const inputs = node.inputs.map(get_name);
-            const outputs = node.outputs.map(get_name);
+            const inputs = node.inputs.flatMap(get_names);
+            const outputs = node.outputs.flatMap(get_names);
             id_mapping.push([id, node.type.name, inputs, outputs]);
             id++;
         }
 
-        // Send IDs to the server.
-        fetch('/model/assign_node_ids', {
-            method: 'POST',
-            headers: {
-                "Content-Type": "application/json",
-            },
-            body: JSON.stringify(id_mapping)
-        })
-        .catch((e) => { this._log_fail('assign_node_ids', e); });
+        // Send IDs to the server, after pending edits which still use the previous IDs.
+        this._sent = this._flush()
+            .then(() => fetch('/model/assign_node_ids', {
+                method: 'POST',
+                headers: {
+                    "Content-Type": "application/json",
+                },
+                body: JSON.stringify(id_mapping)
+            }))
+            .then((status) => {
+                if (!status.ok) {
+                    return status.text().then((text) => { throw new Error(text); });
+                }
+                return null;
+            })
+            .catch((e) => { this._log_fail('assign_node_ids', e); });
     }
 
     download(host) {
-        fetch('/model/save', { method: 'GET' })
+        this._flush()
+            .then(() => fetch('/model/save', { method: 'GET' }))
             .then((status) => {
+                // Models over 2 GB are sent as a zip archive with an external data file.
+                const archive = status.headers.get('Content-Type') === 'application/zip';
                 status.blob().then((blob) => {
                     const bigBlob = new Blob([ blob ]);
-                    host.export('modified.onnx', bigBlob);
+                    host.export(archive ? 'modified.zip' : 'modified.onnx', bigBlob);
                 });
             })
             .catch((e) => { this._log_fail('download', e); });
@@ -74,7 +89,8 @@ client.Client = class {
 
     _do_advanced_model_edit(host, route) {
         let blobblob = null; // FIXME
-        return fetch(route, { method: 'GET' })
+        return this._flush()
+            .then(() => fetch(route, { method: 'GET' }))
             .then((status) => {
                 if (!status.ok) {
                     console.log(status);
@@ -119,6 +135,29 @@ client.Client = class {
             // .catch((e) => { this._log_fail('fold_constants', e); });
     }
 
+    // Resolves to the model as currently held by the server.
+    reload(host) {
+        return this._do_advanced_model_edit(host, '/model/save');
+    }
+
+    undo(host) {
+        return this._do_journal_edit(host, '/model/undo', 'undone');
+    }
+
+    redo(host) {
+        return this._do_journal_edit(host, '/model/redo', 'redone');
+    }
+
+    // Undo and redo are cheap on the server, the view reloads the saved model afterwards.
+    // Resolves to null if there was nothing to undo or redo.
+    _do_journal_edit(host, route, key) {
+        return this._flush()
+            .then(() => fetch(route, { method: 'POST' }))
+            .then((status) => status.json())
+            .then((body) => body[key] ? this._do_advanced_model_edit(host, '/model/save') : null)
+            .catch((e) => { this._log_fail(key, e); });
+    }
+
     add_attr(node_id, attr_name, attr_value, attr_type) {
         this._do_model_edit('add_attr', {
             'node_id': node_id,
@@ -255,21 +294,56 @@ client.Client = class {
         });
     }
 
-    // Helper function to send a model edit to the server.
+    // Helper function to queue a model edit for the server.
+    // Edits queued during one animation frame are sent together as a single batch.
     // If server is not connected, this function does nothing.
     _do_model_edit(action_name, params) {
         if (!this.connected) return;
 
         params['action'] = action_name;
 
-        fetch('/model/edit', {
-            method: 'POST',
-            headers: {
-                "Content-Type": "application/json",
-            },
-            body: JSON.stringify(params)
-        })
-        .catch((e) => { this._log_fail(action_name, e); });
+        this._edits.push(params);
+        if (this._edits.length === 1) {
+            const schedule = typeof requestAnimationFrame === 'function' ?
+                requestAnimationFrame : (callback) => setTimeout(callback, 0);
+            schedule(() => this._flush());
+        }
+    }
+
+    // Sends queued edits, batches are chained so the server applies them in order.
+    // The returned promise resolves once all edits sent so far have been applied.
+    _flush() {
+        if (this._edits.length > 0) {
+            const edits = this._edits;
+            this._edits = [];
+            this._sent = this._sent
+                .then(() => fetch('/model/edit/batch', {
+                    method: 'POST',
+                    headers: {
+                        "Content-Type": "application/json",
+                    },
+                    body: JSON.stringify(edits)
+                }))
+                .then((status) => {
+                    if (!status.ok) {
+                        return status.json().then((body) => {
+                            const index = body.results.findIndex((result) => result.status === 'failed');
+                            const edit = edits[index];
+                            throw new Error(edit.action + ' failed, batch of ' + edits.length +
+                                ' edits reverted: ' + body.results[index].error);
+                        });
+                    }
+                    return null;
+                })
+                .catch((e) => {
+                    this._log_fail('edit', e);
+                    // The shown graph still has the reverted edits applied.
+                    if (this.on_revert) {
+                        this.on_revert(e);
+                    }
+                });
+        }
+        return this._sent;
     }
 
     _log_fail(action_name, e) {
@@ -12,6 +12,7 @@ grapher.Graph = class {
         this._children = {};
         this._children['\x00'] = {};
         this._parent = {};
+        this.layout = null;
     }
 
     get options() {
@@ -165,7 +166,11 @@ grapher.Graph = class {
     }
 
     update() {
-        dagre.layout(this);
+        if (this.layout && !this._isCompound && this.layout.rank.length === this.nodes.size) {
+            this._place(this.layout);
+        } else {
+            dagre.layout(this);
+        }
         for (const nodeId of this.nodes.keys()) {
             const node = this.node(nodeId);
             if (this.children(nodeId).length == 0) {
@@ -185,6 +190,48 @@ grapher.Graph = class {
             edge.label.update();
         }
     }
+
+    _place(layout) {
+        // Position nodes at precomputed layered (rank, order) coordinates instead of running dagre.
+        const horizontal = (this.options.rankdir || 'TB').toUpperCase() === 'LR';
+        const ranksep = this.options.ranksep === undefined ? 50 : this.options.ranksep;
+        const nodesep = this.options.nodesep === undefined ? 50 : this.options.nodesep;
+        const depthOf = (label) => horizontal ? label.width : label.height;
+        const breadthOf = (label) => horizontal ? label.height : label.width;
+        const ranks = [];
+        for (const node of this.nodes.values()) {
+            const index = parseInt(node.v, 10);
+            const rank = layout.rank[index];
+            ranks[rank] = ranks[rank] || [];
+            ranks[rank].push({ order: layout.order[index], label: node.label });
+        }
+        let maxBreadth = 0;
+        for (const rank of ranks.filter((rank) => rank)) {
+            rank.sort((a, b) => a.order - b.order);
+            rank.breadth = rank.reduce((breadth, entry) => breadth + breadthOf(entry.label) + nodesep, -nodesep);
+            maxBreadth = Math.max(maxBreadth, rank.breadth);
+        }
+        let position = 0;
+        for (const rank of ranks.filter((rank) => rank)) {
+            const depth = rank.reduce((depth, entry) => Math.max(depth, depthOf(entry.label)), 0);
+            let offset = (maxBreadth - rank.breadth) / 2;
+            for (const entry of rank) {
+                const breadth = breadthOf(entry.label);
+                entry.label.x = horizontal ? position + depth / 2 : offset + breadth / 2;
+                entry.label.y = horizontal ? offset + breadth / 2 : position + depth / 2;
+                offset += breadth + nodesep;
+            }
+            position += depth + ranksep;
+        }
+        for (const edge of this.edges.values()) {
+            const from = edge.label.from;
+            const to = edge.label.to;
+            const middle = { x: (from.x + to.x) / 2, y: (from.y + to.y) / 2 };
+            edge.label.points = [ { x: from.x, y: from.y }, middle, { x: to.x, y: to.y } ];
+            edge.label.x = middle.x;
+            edge.label.y = middle.y;
+        }
+    }
 };
 
 grapher.Node = class {
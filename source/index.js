@@ -197,8 +197,8 @@ host.BrowserHost = class {
 
         if (this._meta.file) {
             const url = this._meta.file[0];
-            if (this._view.accept(url)) {
-                this._openModel(this._url(url), null);
+            if (this._view.accept(url.split('?')[0])) {
+                this._watch(this._openModel(this._url(url), null));
                 return;
             }
         }
@@ -541,6 +541,31 @@ host.BrowserHost = class {
         });
     }
 
+    _watch(opened) {
+        if (this.type === 'Python' && this.window.EventSource) {
+            const source = new this.window.EventSource(this._url('events'));
+            source.addEventListener('update', (e) => {
+                const data = JSON.parse(e.data);
+                opened = this._openModel(this._url(data.file), null).then(() => {
+                    this.document.title = data.title || this.document.title;
+                });
+            });
+            source.addEventListener('shapes', (e) => {
+                const data = JSON.parse(e.data);
+                const request = this._request(this._url(data.file), null, 'utf-8');
+                Promise.all([ request, opened ]).then((values) => {
+                    const model = this._view.model;
+                    if (model && model.update) {
+                        model.update(JSON.parse(values[0]).types);
+                        this._view.refresh();
+                    }
+                }).catch(() => {
+                    // Types are optional, the graph stays as rendered.
+                });
+            });
+        }
+    }
+
     _open(file, files) {
         this._view.show('welcome spinner');
         const context = new host.BrowserHost.BrowserFileContext(this, file, files);
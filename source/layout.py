@@ -0,0 +1,66 @@
+''' Layered graph layout '''
+
+import numpy # pylint: disable=import-error
+
+def layout(count, sources, targets, iterations=8):
+    ''' Assign layered coordinates to the nodes of a directed graph.
+
+    Returns a (rank, order) tuple of int32 arrays. Rank is the longest path distance from a
+    source node, order is the position within the rank after barycenter sweeps over the
+    predecessors and successors of each node that reduce edge crossings.
+    '''
+    sources = numpy.asarray(sources, dtype=numpy.int64)
+    targets = numpy.asarray(targets, dtype=numpy.int64)
+    keep = sources != targets
+    sources = sources[keep]
+    targets = targets[keep]
+    rank = _rank(count, sources, targets)
+    order = _order(count, sources, targets, rank, iterations)
+    return rank.astype(numpy.int32), order.astype(numpy.int32)
+
+def _rank(count, sources, targets):
+    # Kahn's algorithm one level at a time, nodes reached from a level are ranked one below it.
+    indices = numpy.argsort(sources, kind='stable')
+    successors = targets[indices]
+    degree = numpy.bincount(sources, minlength=count)
+    offsets = numpy.cumsum(degree) - degree
+    indegree = numpy.bincount(targets, minlength=count)
+    rank = numpy.zeros(count, dtype=numpy.int64)
+    frontier = numpy.flatnonzero(indegree == 0)
+    level = 0
+    while len(frontier) > 0:
+        level += 1
+        counts = degree[frontier]
+        ends = numpy.cumsum(counts)
+        positions = numpy.arange(ends[-1]) + numpy.repeat(offsets[frontier] - ends + counts, counts)
+        reached = successors[positions]
+        rank[reached] = level
+        numpy.subtract.at(indegree, reached, 1)
+        frontier = numpy.unique(reached[indegree[reached] == 0])
+    return rank
+
+def _order(count, sources, targets, rank, iterations): # pylint: disable=too-many-locals
+    if count == 0:
+        return numpy.zeros(0, dtype=numpy.int64)
+    sizes = numpy.bincount(rank)
+    starts = numpy.concatenate(([ 0 ], numpy.cumsum(sizes)[:-1]))
+    order = _sort(rank, numpy.arange(count, dtype=numpy.float64), starts)
+    ends = numpy.concatenate((sources, targets))
+    neighbors = numpy.concatenate((targets, sources))
+    degree = numpy.bincount(ends, minlength=count)
+    updates = [ (degree > 0) & (rank % 2 == _) for _ in (0, 1) ]
+    for _ in range(iterations):
+        # Even and odd ranks are reordered in turn against their fixed neighbor ranks.
+        for update in updates:
+            position = (order + 0.5) / sizes[rank]
+            total = numpy.bincount(ends, weights=position[neighbors], minlength=count)
+            barycenter = numpy.where(update, total / numpy.maximum(degree, 1), position)
+            order = _sort(rank, barycenter, starts, order)
+    return order
+
+def _sort(rank, key, starts, order=None):
+    keys = (key, rank) if order is None else (order, key, rank)
+    indices = numpy.lexsort(keys)
+    result = numpy.empty(len(rank), dtype=numpy.int64)
+    result[indices] = numpy.arange(len(rank)) - starts[rank[indices]]
+    return result
@@ -2,8 +2,16 @@
 
 import collections
 import enum
+import hashlib
+import itertools
 import json
+import mmap
 import os
+import subprocess
+import sys
+import threading
+import urllib.parse
+import zlib
 
 class ModelFactory: # pylint: disable=too-few-public-methods
     ''' ONNX backend model factory '''
@@ -13,14 +21,126 @@ class ModelFactory: # pylint: disable=too-few-public-methods
 class _Model: # pylint: disable=too-few-public-methods
     def __init__(self, model):
         ''' Serialize ONNX model to JSON message '''
-        # import onnx.shape_inference
-        # model = onnx.shape_inference.infer_shapes(model)
         self.value = model
-        self.metadata = _Metadata()
-        self.graph = _Graph(model.graph, self.metadata)
+        self.metadata = _Metadata.open()
+        opsets = dict((_.domain or 'ai.onnx', _.version) for _ in model.opset_import)
+        self.graph = _Graph(model.graph, self.metadata, opsets)
 
     def to_json(self): # pylint: disable=missing-function-docstring
         ''' Serialize model to JSON message '''
+        json_model = self._header()
+        json_model['graphs'] = []
+        json_model['graphs'].append(self.graph.to_json())
+        return json_model
+
+    def to_json_stream(self):
+        ''' Serialize model to compact JSON text chunks, one node at a time '''
+        text = json.dumps(self._header(), ensure_ascii=False, separators=(',', ':'))
+        yield text[:-1] + ',"graphs":['
+        yield from self.graph.to_json_stream()
+        yield ']}'
+
+    def nodes(self, start=0, count=1000):
+        ''' Serialize a range of nodes of the main graph '''
+        return self.graph.nodes(start, count)
+
+    def neighborhood(self, node=None, tensor=None, hops=1):
+        ''' Serialize the k-hop neighborhood of a node index or tensor name '''
+        return self.graph.neighborhood(node, tensor, hops)
+
+    def layout(self):
+        ''' Compute layered (rank, order) coordinates of the main graph nodes '''
+        from .layout import layout # pylint: disable=import-outside-toplevel
+        sources, targets = self.graph.edges()
+        rank, order = layout(len(self.graph.node_list), sources, targets)
+        return { 'rank': rank.tolist(), 'order': order.tolist() }
+
+    def collapsed(self, size=0):
+        ''' Serialize model with repeated blocks of the main graph collapsed, None if the
+        graph has size nodes or less or no repeated blocks '''
+        json_graph = self.graph.collapsed(size)
+        if json_graph is None:
+            return None
+        json_model = self._header()
+        json_model['graphs'] = [ json_graph ]
+        return json_model
+
+    def digest(self):
+        ''' Return hash of model, operator metadata version and graph encoding '''
+        # Only what the JSON contains is hashed, so the key does not depend on how the model
+        # was loaded. Weights are not part of the JSON, initializers are hashed by name, type
+        # and shape unless their values are inlined.
+        digest = hashlib.blake2b(digest_size=16)
+        model = self.value
+        for descriptor, value in model.ListFields():
+            if descriptor.name != 'graph':
+                _digest(digest, descriptor.name, value)
+        for descriptor, value in model.graph.ListFields():
+            if descriptor.name != 'initializer':
+                _digest(digest, descriptor.name, value)
+        for tensor in model.graph.initializer:
+            count = 1
+            for dim in tensor.dims:
+                count *= dim
+            values = _Tensor(tensor).inline(count)
+            header = (tensor.name, list(tensor.dims), tensor.data_type, values)
+            digest.update(repr(header).encode('utf-8'))
+        digest.update(format(self.metadata.checksum, '08x').encode('utf-8'))
+        digest.update(b'columns')
+        return digest.hexdigest()
+
+    def shapes(self, timeout=None):
+        ''' Infer value types of the main graph in a child process, which is killed after
+        timeout seconds '''
+        # Shape inference holds the GIL for the whole call and would stall request threads.
+        root_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        env = dict(os.environ)
+        env['PYTHONPATH'] = os.pathsep.join(filter(None, [ root_dir, env.get('PYTHONPATH') ]))
+        command = 'import ' + __name__ + ' as _; _._infer_shapes()'
+        try:
+            process = subprocess.run([ sys.executable, '-c', command ],
+                input=self._structure().SerializeToString(), stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL, env=env, check=True, timeout=timeout)
+        except subprocess.TimeoutExpired:
+            raise TimeoutError('Shape inference timed out after ' + str(timeout) + \
+                ' seconds.') from None
+        except subprocess.CalledProcessError as error:
+            raise RuntimeError('Shape inference failed with exit status ' + \
+                str(error.returncode) + '.') from None
+        return json.loads(process.stdout)
+
+    def _structure(self, size_limit=1024):
+        ''' Copy of model with initializers over size_limit bytes reduced to type and shape '''
+        # Shape inference only propagates data of small constants, copying the weights would
+        # double memory and models over 2 GB cannot be serialized.
+        model = type(self.value)()
+        for descriptor, value in self.value.ListFields():
+            if descriptor.name != 'graph':
+                _assign(model, descriptor.name, value)
+        for descriptor, value in self.value.graph.ListFields():
+            if descriptor.name != 'initializer':
+                _assign(model.graph, descriptor.name, value)
+        for tensor in self.value.graph.initializer:
+            initializer = model.graph.initializer.add()
+            if tensor.ByteSize() <= size_limit:
+                initializer.CopyFrom(tensor)
+            else:
+                initializer.name = tensor.name
+                initializer.dims.extend(tensor.dims)
+                initializer.data_type = tensor.data_type
+                initializer.data_location = _DataLocation.EXTERNAL
+        return model
+
+    def tensor(self, name, base_dir='.'):
+        ''' Return little-endian payload of initializer as byte buffer, or as a
+        (filename, offset, length) tuple for external data, None if not available '''
+        tensor = self.graph.initializers.get(name)
+        if tensor is None:
+            return None
+        tensor = _Tensor(tensor)
+        return tensor.location(base_dir) if tensor.external() else tensor.buffer()
+
+    def _header(self):
         model = self.value
         json_model = {}
         json_model['signature'] = 'netron:onnx'
@@ -35,8 +155,6 @@ class _Model: # pylint: disable=too-few-public-methods
         json_metadata = self._metadata_props(model.metadata_props)
         if len(json_metadata) > 0:
             json_model['metadata'] = json_metadata
-        json_model['graphs'] = []
-        json_model['graphs'].append(self.graph.to_json())
         return json_model
 
     def _metadata_props(self, metadata_props): # pylint: disable=missing-function-docstring
@@ -72,24 +190,28 @@ class _Model: # pylint: disable=too-few-public-methods
             json_metadata.append({ 'name': name, 'value': value })
         return json_metadata
 
-class _Graph:
-    def __init__(self, graph, metadata):
+class _Graph: # pylint: disable=too-many-instance-attributes
+    def __init__(self, graph, metadata, opsets=None):
         self.metadata = metadata
+        self.opsets = opsets if opsets else {}
         self.value = graph
-        self.arguments_index = {}
-        self.arguments = []
+        self.tensor_types = {}
+        self.initializers = dict((_.name, _) for _ in graph.initializer)
+        self.lock = threading.Lock()
+        self.node_list = None
+        self.producers = None
+        self.consumers = None
 
-    def _tensor(self, tensor): # pylint: disable=unused-argument
-        return {}
-
-    def argument(self, name, tensor_type=None, initializer=None): # pylint: disable=missing-function-docstring
-        if not name in self.arguments_index:
-            argument = _Argument(name, tensor_type, initializer)
-            self.arguments_index[name] = len(self.arguments)
-            self.arguments.append(argument)
-        index = self.arguments_index[name]
-        # argument.set_initializer(initializer)
-        return index
+    def _tensor(self, tensor):
+        if tensor.DESCRIPTOR.name == 'SparseTensorProto':
+            return { 'type': _Tensor(tensor.values).type(tensor.dims) }
+        json_tensor = _Tensor(tensor).to_json()
+        # Weights of repeated layers share type objects.
+        key = (tensor.data_type, tuple(tensor.dims))
+        json_tensor['type'] = self.tensor_types.setdefault(key, json_tensor['type'])
+        if tensor.name and tensor.name in self.initializers:
+            json_tensor['location'] = 'tensors/' + urllib.parse.quote(tensor.name, safe='')
+        return json_tensor
 
     def attribute(self, _, op_type): # pylint: disable=missing-function-docstring,too-many-branches
         if _.type == _AttributeType.UNDEFINED:
@@ -138,76 +260,455 @@ class _Graph:
         return json_attribute
 
     def to_json(self): # pylint: disable=missing-function-docstring
+        return json.loads(''.join(self.to_json_stream()))
+
+    def to_json_stream(self):
+        ''' Serialize graph to compact JSON text chunks, the node table one column at a time '''
         graph = self.value
-        json_graph = {
-            'nodes': [],
+        columns = _Columns(self)
+        for value_info in graph.value_info:
+            columns.argument(value_info.name)
+        for initializer in graph.initializer:
+            columns.argument(initializer.name)
+        yield '{"nodes":'
+        yield from columns.to_json_stream(graph.node)
+        yield ',"attributes":'
+        yield from _array(columns.attributes)
+        yield ',"inputs":[],"outputs":[],"arguments":{"name":'
+        yield from _array(columns.arguments)
+        yield ',"initializers":'
+        # Initializers are serialized as they are written, tensor messages are not kept.
+        yield from _array(([ columns.argument(_.name), self._tensor(_) ] \
+            for _ in graph.initializer), 256)
+        yield '}}'
+
+    def nodes(self, start=0, count=1000):
+        ''' Serialize node range to a standalone graph JSON message '''
+        self._index()
+        start = max(0, start)
+        return self._window(range(start, min(start + max(0, count), len(self.node_list))))
+
+    def neighborhood(self, node=None, tensor=None, hops=1):
+        ''' Serialize nodes within hops of a node index or tensor name '''
+        self._index()
+        if tensor is not None and (tensor in self.producers or tensor in self.consumers):
+            frontier = set(self.consumers.get(tensor, []))
+            if tensor in self.producers:
+                frontier.add(self.producers[tensor])
+            hops -= 1
+        elif node is not None and 0 <= node < len(self.node_list):
+            frontier = { node }
+        else:
+            return None
+        visited = set(frontier)
+        for _ in range(max(0, hops)):
+            neighbors = set()
+            for index in frontier:
+                current = self.node_list[index]
+                neighbors.update(self.producers[_] for _ in current.input if _ in self.producers)
+                for value in current.output:
+                    neighbors.update(self.consumers.get(value, []))
+            frontier = neighbors - visited
+            visited.update(frontier)
+        return self._window(sorted(visited))
+
+    def edges(self):
+        ''' Return (sources, targets) node index lists of producer to consumer edges '''
+        self._index()
+        sources = []
+        targets = []
+        for value, consumers in self.consumers.items():
+            producer = self.producers.get(value)
+            if producer is not None:
+                sources.extend([ producer ] * len(consumers))
+                targets.extend(consumers)
+        return sources, targets
+
+    def _index(self):
+        with self.lock:
+            if self.node_list is None:
+                self.producers = {}
+                self.consumers = {}
+                node_list = list(self.value.node)
+                for index, node in enumerate(node_list):
+                    for value in node.input:
+                        if value:
+                            self.consumers.setdefault(value, []).append(index)
+                    for value in node.output:
+                        if value:
+                            self.producers[value] = index
+                self.node_list = node_list
+
+    def _window(self, items):
+        ''' Serialize node indices and (start, length) blocks to a standalone graph message '''
+        nodes = [ self.node_list[_] if isinstance(_, int) else self._block(_[0], _[1]) \
+            for _ in items ]
+        columns = _Columns(self)
+        json_nodes = json.loads(''.join(columns.to_json_stream(nodes)))
+        return {
+            'total': len(self.node_list),
+            'indices': [ _ if isinstance(_, int) else _[0] for _ in items ],
+            'nodes': json_nodes,
+            'attributes': columns.attributes,
             'inputs': [],
             'outputs': [],
-            'arguments': []
+            'arguments': {
+                'name': columns.arguments,
+                'initializers': [ [ index, self._tensor(self.initializers[name]) ] \
+                    for index, name in enumerate(columns.arguments) if name in self.initializers ]
+            }
         }
-        for value_info in graph.value_info:
-            self.argument(value_info.name)
-        for initializer in graph.initializer:
-            self.argument(initializer.name, None, initializer)
-        for node in graph.node:
-            op_type = node.op_type
-            json_node = {}
-            json_node_type = {}
-            json_node_type['name'] = op_type
-            type_metadata = self.metadata.type(op_type)
-            if type and 'category' in type_metadata:
-                json_node_type['category'] = type_metadata['category']
-            json_node['type'] = json_node_type
-            if node.name:
-                json_node['name'] = node.name
-            json_node['inputs'] = []
-            for value in node.input:
-                json_node['inputs'].append({
-                        'name': 'X',
-                        'arguments': [ self.argument(value) ]
-                    })
-            json_node['outputs'] = []
-            for value in node.output:
-                json_node['outputs'].append({
-                        'name': 'X',
-                        'arguments': [ self.argument(value) ]
-                    })
-            json_node['attributes'] = []
-            for _ in node.attribute:
-                json_attribute = self.attribute(_, op_type)
-                json_node['attributes'].append(json_attribute)
-            json_graph['nodes'].append(json_node)
-        for _ in self.arguments:
-            json_graph['arguments'].append(_.to_json())
+
+    def collapsed(self, size=0):
+        ''' Serialize graph with repeats of a block after the first collapsed to Block nodes,
+        None if the graph has size nodes or less or no repeated blocks '''
+        if len(self.value.node) <= size:
+            return None
+        from .blocks import find # pylint: disable=import-outside-toplevel
+        runs = find(self.tokens())
+        if not runs:
+            return None
+        items = []
+        position = 0
+        for start, length, count in runs:
+            items.extend(range(position, start + length))
+            items.extend((start + i * length, length) for i in range(1, count))
+            position = start + length * count
+        items.extend(range(position, len(self.node_list)))
+        json_graph = self._window(items)
+        json_graph['blocks'] = [ { 'start': start, 'length': length, 'count': count } \
+            for start, length, count in runs ]
         return json_graph
 
-class _Argument: # pylint: disable=too-few-public-methods
-    def __init__(self, name, tensor_type=None, initializer=None):
-        self.name = name
-        self.type = tensor_type
-        self.initializer = initializer
+    def tokens(self):
+        ''' Return structural hash of each node from operator, attributes and relative inputs '''
+        self._index()
+        tokens = []
+        for index, node in enumerate(self.node_list):
+            inputs = []
+            for value in node.input:
+                if not value:
+                    inputs.append(0)
+                elif value in self.initializers:
+                    inputs.append(-1)
+                elif value not in self.producers:
+                    inputs.append(-2)
+                elif len(self.consumers[value]) > 2:
+                    # Shared values like masks are consumed by every block at varying distance.
+                    inputs.append(-3)
+                else:
+                    inputs.append(index - self.producers[value])
+            attributes = tuple((_.name, _.type, _.i, _.f, _.s, tuple(_.ints), tuple(_.floats),
+                tuple(_.strings)) for _ in node.attribute)
+            tokens.append(hash((node.op_type, node.domain, tuple(inputs), len(node.output),
+                attributes)))
+        return tokens
+
+    def _block(self, first, length):
+        ''' Create Block node for a node range with the values crossing its boundary '''
+        nodes = self.node_list[first:first + length]
+        outputs = [ value for node in nodes for value in node.output if value ]
+        produced = set(outputs)
+        graph_outputs = set(_.name for _ in self.value.output)
+        inputs = []
+        for node in nodes:
+            for value in node.input:
+                if value and value not in produced and value not in self.initializers and \
+                    value not in inputs:
+                    inputs.append(value)
+        outputs = [ value for value in outputs if value in graph_outputs or \
+            any(not first <= _ < first + length for _ in self.consumers.get(value, [])) ]
+        block = type(nodes[0])()
+        block.op_type = 'Block'
+        block.domain = 'netron'
+        block.name = nodes[0].name if nodes[0].name else str(first)
+        block.input.extend(inputs)
+        block.output.extend(outputs)
+        for name, value in (('start', first), ('length', length)):
+            attribute = block.attribute.add()
+            attribute.name = name
+            attribute.type = _AttributeType.INT
+            attribute.i = value
+        return block
+
+    def _type(self, node):
+        json_node_type = {}
+        json_node_type['name'] = node.op_type
+        domain = node.domain or 'ai.onnx'
+        type_metadata = self.metadata.type(node.op_type, domain, self.opsets.get(domain))
+        if type and 'category' in type_metadata:
+            json_node_type['category'] = type_metadata['category']
+        return json_node_type
+
+class _Columns:
+    ''' Struct-of-arrays node table with interned types, attributes and arguments, node
+    inputs, outputs and attributes are index ranges given by offsets '''
+
+    __slots__ = [ 'graph', 'types', 'types_index', 'attributes', 'attributes_index',
+        'arguments', 'arguments_index' ]
+
+    def __init__(self, graph):
+        self.graph = graph
+        self.types = []
+        self.types_index = {}
+        self.attributes = []
+        self.attributes_index = {}
+        self.arguments = []
+        self.arguments_index = {}
+
+    def type(self, node): # pylint: disable=missing-function-docstring
+        key = (node.op_type, node.domain)
+        index = self.types_index.get(key)
+        if index is None:
+            index = self.types_index[key] = len(self.types)
+            self.types.append(self.graph._type(node)) # pylint: disable=protected-access
+        return index
+
+    def attribute(self, node, _): # pylint: disable=missing-function-docstring
+        # Tensor payloads are not hashed, other attributes repeat across layers.
+        key = None if _.type in _tensor_attribute_types else (node.op_type, _.SerializeToString())
+        index = self.attributes_index.get(key)
+        if index is None:
+            index = len(self.attributes)
+            self.attributes.append(self.graph.attribute(_, node.op_type))
+            if key is not None:
+                self.attributes_index[key] = index
+        return index
+
+    def argument(self, name): # pylint: disable=missing-function-docstring
+        index = self.arguments_index.get(name)
+        if index is None:
+            index = self.arguments_index[name] = len(self.arguments)
+            self.arguments.append(name)
+        return index
+
+    def to_json_stream(self, nodes):
+        ''' Serialize node table to JSON text chunks in one pass over nodes per column '''
+        # Only the interned tables are kept, a column is written while it is computed.
+        yield '{"type":'
+        yield from _array(self.type(node) for node in nodes)
+        yield ',"types":'
+        yield from _array(self.types)
+        yield ',"name":'
+        yield from _array(node.name for node in nodes)
+        for key, field in (('inputs', 'input'), ('outputs', 'output')):
+            yield ',"' + key + '":{"offsets":'
+            yield from _array(itertools.accumulate((len(getattr(node, field)) for node in nodes),
+                initial=0))
+            yield ',"values":'
+            yield from _array(self.argument(value) for node in nodes \
+                for value in getattr(node, field))
+            yield '}'
+        yield ',"attributes":{"offsets":'
+        yield from _array(itertools.accumulate((len(node.attribute) for node in nodes), initial=0))
+        yield ',"values":'
+        yield from _array(self.attribute(node, _) for node in nodes for _ in node.attribute)
+        yield '}}'
+
+class _Tensor:
+    ''' Tensor metadata and payload encoding, values are only decoded for small tensors '''
+
+    inline_size = 16
+
+    def __init__(self, tensor):
+        self.value = tensor
+        self.data_type = _data_types.get(tensor.data_type, ('?', 0, None))
+
+    def type(self, dims=None): # pylint: disable=missing-function-docstring
+        dims = self.value.dims if dims is None else dims
+        return { 'dataType': self.data_type[0], 'shape': { 'dimensions': list(dims) } }
 
     def to_json(self): # pylint: disable=missing-function-docstring
-        target = {}
-        target['name'] = self.name
-        if self.initializer:
-            target['initializer'] = {}
-        return target
+        tensor = self.value
+        json_tensor = {}
+        json_tensor['type'] = self.type()
+        count = 1
+        for dim in tensor.dims:
+            count *= dim
+        external = self.external()
+        if external:
+            entries = dict((_.key, _.value) for _ in tensor.external_data)
+            if 'length' in entries:
+                json_tensor['byteSize'] = int(entries['length'])
+        elif tensor.HasField('raw_data'):
+            json_tensor['byteSize'] = len(tensor.raw_data)
+        elif self.data_type[1] > 0:
+            json_tensor['byteSize'] = count * self.data_type[1]
+        values = self.inline(count)
+        if values is not None:
+            json_tensor['layout'] = '|'
+            json_tensor['values'] = values
+        return json_tensor
+
+    def inline(self, count):
+        ''' Return values sent as part of the JSON, None for external or larger tensors '''
+        if self.external() or count > self.inline_size:
+            return None
+        return self._values()
+
+    def external(self): # pylint: disable=missing-function-docstring
+        return self.value.data_location == _DataLocation.EXTERNAL
+
+    def location(self, base_dir='.'):
+        ''' Return (filename, offset, length) of external data, None if outside base_dir '''
+        entries = dict((_.key, _.value) for _ in self.value.external_data)
+        base_dir = os.path.realpath(base_dir)
+        filename = os.path.realpath(os.path.join(base_dir, entries.get('location', '')))
+        if os.path.commonprefix([ base_dir, filename ]) != base_dir or \
+            not os.path.isfile(filename):
+            return None
+        offset = int(entries.get('offset', 0))
+        size = os.path.getsize(filename)
+        length = int(entries['length']) if 'length' in entries else size - offset
+        if offset + length > size:
+            return None
+        return (filename, offset, length)
+
+    def buffer(self):
+        ''' Return payload of tensor stored in the model, raw_data is copied by protobuf '''
+        tensor = self.value
+        if tensor.HasField('raw_data'):
+            return tensor.raw_data
+        if not self.data_type[2]:
+            return None
+        return memoryview(self._array()).cast('B')
+
+    def _array(self):
+        import numpy # pylint: disable=import-outside-toplevel
+        tensor = self.value
+        storage = self.data_type[2]
+        if tensor.HasField('raw_data'):
+            return numpy.frombuffer(tensor.raw_data, dtype=storage)
+        fields = [ tensor.float_data, tensor.int32_data, tensor.int64_data,
+            tensor.double_data, tensor.uint64_data ]
+        values = next((_ for _ in fields if len(_) > 0), [])
+        return numpy.ascontiguousarray(numpy.array(values).astype(storage))
+
+    def _values(self):
+        import numpy # pylint: disable=import-outside-toplevel
+        name, _, storage = self.data_type
+        if not storage or name == 'bfloat16' or name.startswith('float8'):
+            return None
+        values = self._array()
+        if name == 'float16':
+            values = values.view('<f2')
+        if name.startswith('float') and not numpy.isfinite(values).all():
+            return None
+        return values.astype(bool if name == 'boolean' else values.dtype).tolist()
+
+class _DataLocation(enum.IntEnum):
+    DEFAULT = 0
+    EXTERNAL = 1
+
+_data_types = {
+    1: ('float32', 4, '<f4'),
+    2: ('uint8', 1, '<u1'),
+    3: ('int8', 1, '<i1'),
+    4: ('uint16', 2, '<u2'),
+    5: ('int16', 2, '<i2'),
+    6: ('int32', 4, '<i4'),
+    7: ('int64', 8, '<i8'),
+    8: ('string', 0, None),
+    9: ('boolean', 1, '<u1'),
+    10: ('float16', 2, '<u2'),
+    11: ('float64', 8, '<f8'),
+    12: ('uint32', 4, '<u4'),
+    13: ('uint64', 8, '<u8'),
+    14: ('complex64', 8, None),
+    15: ('complex128', 16, None),
+    16: ('bfloat16', 2, '<u2'),
+    17: ('float8e4m3fn', 1, '<u1'),
+    18: ('float8e4m3fnuz', 1, '<u1'),
+    19: ('float8e5m2', 1, '<u1'),
+    20: ('float8e5m2fnuz', 1, '<u1')
+}
 
 class _Metadata: # pylint: disable=too-few-public-methods
-    metadata = {}
+    ''' Operator metadata index keyed by (domain, name, since_version), shared by all models '''
+
+    _instance = None
+    _lock = threading.Lock()
+
+    @classmethod
+    def open(cls):
+        ''' Return process-wide metadata index '''
+        with cls._lock:
+            if cls._instance is None:
+                cls._instance = _Metadata()
+            return cls._instance
 
     def __init__(self):
         metadata_file = os.path.join(os.path.dirname(__file__), 'onnx-metadata.json')
-        with open(metadata_file, 'r', encoding='utf-8') as file:
-            for item in json.load(file):
-                name = item['name']
-                self.metadata[name] = item
+        with open(metadata_file, 'rb') as file:
+            self.data = file.read()
+        self.index = {}
+        self.types = {}
+        checksum = zlib.crc32(self.data)
+        self.checksum = checksum
+        index_file = os.path.splitext(metadata_file)[0] + '.index'
+        entries = self._load_index(index_file, checksum)
+        if entries is None:
+            entries = self._build_index()
+            self._save_index(index_file, checksum, entries)
+        for domain, name, version, offset, length in entries:
+            self.index.setdefault((domain, name), []).append((version, offset, length))
+        for versions in self.index.values():
+            versions.sort()
+
+    def type(self, name, domain='ai.onnx', version=None):
+        ''' Return metadata of the latest operator version not newer than opset version '''
+        versions = self.index.get((domain, name))
+        if not versions:
+            return {}
+        entry = versions[0]
+        for _ in versions:
+            if version is None or _[0] <= version:
+                entry = _
+        key = (domain, name, entry[0])
+        if key not in self.types:
+            offset, length = entry[1], entry[2]
+            self.types[key] = json.loads(self.data[offset:offset + length].decode('utf-8'))
+        return self.types[key]
+
+    def _build_index(self):
+        text = self.data.decode('utf-8')
+        decoder = json.JSONDecoder()
+        entries = []
+        position = text.index('[') + 1
+        offset = len(text[:position].encode('utf-8'))
+        while True:
+            start = position
+            while text[position] in ' \t\r\n,':
+                position += 1
+            if text[position] == ']':
+                break
+            offset += len(text[start:position].encode('utf-8'))
+            item, end = decoder.raw_decode(text, position)
+            length = len(text[position:end].encode('utf-8'))
+            entries.append([ item.get('module', 'ai.onnx'), item['name'], item.get('version', 1),
+                offset, length ])
+            offset += length
+            position = end
+        return entries
 
-    def type(self, name): # pylint: disable=missing-function-docstring
-        if name in self.metadata:
-            return self.metadata[name]
-        return {}
+    @staticmethod
+    def _load_index(index_file, checksum):
+        try:
+            with open(index_file, 'r', encoding='utf-8') as file:
+                index = json.load(file)
+            if index['checksum'] == checksum:
+                return index['entries']
+        except (OSError, ValueError, KeyError):
+            pass
+        return None
+
+    @staticmethod
+    def _save_index(index_file, checksum, entries):
+        try:
+            with open(index_file, 'w', encoding='utf-8') as file:
+                json.dump({ 'checksum': checksum, 'entries': entries }, file, separators=(',', ':'))
+        except OSError:
+            pass
 
 class _AttributeType(enum.IntEnum):
     UNDEFINED = 0
@@ -225,3 +726,150 @@ class _AttributeType(enum.IntEnum):
     SPARSE_TENSORS = 12
     TYPE_PROTO = 13
     TYPE_PROTOS = 14
+
+_tensor_attribute_types = { _AttributeType.TENSOR, _AttributeType.SPARSE_TENSOR }
+
+def _digest(digest, name, value):
+    ''' Update hash with a protobuf field, repeated fields one item at a time '''
+    digest.update(name.encode('utf-8'))
+    if hasattr(value, 'SerializeToString'):
+        digest.update(value.SerializeToString())
+    elif isinstance(value, (str, bytes, int, float, bool)):
+        digest.update(repr(value).encode('utf-8'))
+    else:
+        for item in value:
+            _digest(digest, '', item)
+
+def _assign(message, name, value):
+    ''' Copy protobuf field value into message '''
+    field = getattr(message, name)
+    if hasattr(field, 'CopyFrom'):
+        field.CopyFrom(value)
+    elif hasattr(field, 'extend'):
+        field.extend(value)
+    else:
+        setattr(message, name, value)
+
+def _array(items, size=4096):
+    ''' Serialize iterable to JSON array text chunks of size items '''
+    items = iter(items)
+    separator = '['
+    while True:
+        chunk = list(itertools.islice(items, size))
+        if not chunk:
+            break
+        yield separator + json.dumps(chunk, ensure_ascii=False, separators=(',', ':'))[1:-1]
+        separator = ','
+    yield '[]' if separator == '[' else ']'
+
+def _infer_shapes():
+    ''' Read serialized model from stdin and write inferred value types to stdout as JSON '''
+    import onnx.shape_inference # pylint: disable=import-outside-toplevel,import-error
+    model = onnx.ModelProto()
+    model.ParseFromString(sys.stdin.buffer.read())
+    model = onnx.shape_inference.infer_shapes(model, strict_mode=False, data_prop=True)
+    graph = model.graph
+    types = {}
+    for value in list(graph.input) + list(graph.value_info) + list(graph.output):
+        if value.type.HasField('tensor_type'):
+            tensor_type = value.type.tensor_type
+            json_type = { 'dataType': _data_types.get(tensor_type.elem_type, ('?',))[0] }
+            if tensor_type.HasField('shape'):
+                dimensions = [ _.dim_value if _.HasField('dim_value') else _.dim_param or '?' \
+                    for _ in tensor_type.shape.dim ]
+                json_type['shape'] = { 'dimensions': dimensions }
+            types[value.name] = json_type
+    json.dump({ 'types': types }, sys.stdout, ensure_ascii=False, separators=(',', ':'))
+
+def load(source, location=None, size_limit=1024):
+    ''' Load ONNX model structure from a file path or buffer without copying tensor payloads.
+
+    Initializer raw_data larger than size_limit bytes is not decoded, the tensor is instead
+    recorded as external data at its byte offset in source, with location defaulting to the
+    file name, so weights can be resolved lazily relative to the model directory.
+    '''
+    import onnx # pylint: disable=import-outside-toplevel
+    if isinstance(source, (str, os.PathLike)):
+        location = os.path.basename(source) if location is None else location
+        with open(source, 'rb') as file:
+            if os.fstat(file.fileno()).st_size == 0:
+                return onnx.ModelProto()
+            with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+                return load(buffer, location, size_limit)
+    with memoryview(source) as view:
+        data = bytearray()
+        for field, wire_type, start, value, end in _fields(view, 0, len(view)):
+            if field == 7 and wire_type == 2:
+                data += _message(7, _graph(view, value, end, location or '', size_limit))
+            else:
+                data += view[start:end]
+    return onnx.ModelProto.FromString(bytes(data))
+
+def _graph(view, begin, end, location, size_limit):
+    data = bytearray()
+    for field, wire_type, start, value, position in _fields(view, begin, end):
+        if field == 5 and wire_type == 2:
+            data += _message(5, _tensor(view, value, position, location, size_limit))
+        else:
+            data += view[start:position]
+    return data
+
+def _tensor(view, begin, end, location, size_limit):
+    data = bytearray()
+    payload = None
+    for field, wire_type, start, value, position in _fields(view, begin, end):
+        if field == 9 and wire_type == 2 and position - value > size_limit:
+            payload = [ ('location', location), ('offset', value), ('length', position - value) ]
+        else:
+            data += view[start:position]
+    if payload:
+        for key, value in payload:
+            entry = _message(1, key.encode('utf-8')) + _message(2, str(value).encode('utf-8'))
+            data += _message(13, entry)
+        data += _varint(14 << 3) + _varint(_DataLocation.EXTERNAL)
+    return data
+
+def _fields(view, position, end):
+    while position < end:
+        start = position
+        key, position = _read_varint(view, position, end)
+        wire_type = key & 7
+        value = position
+        if wire_type == 0:
+            _, position = _read_varint(view, position, end)
+        elif wire_type == 1:
+            position += 8
+        elif wire_type == 2:
+            length, value = _read_varint(view, position, end)
+            position = value + length
+        elif wire_type == 5:
+            position += 4
+        else:
+            raise ValueError("Unsupported protobuf wire type '" + str(wire_type) + "'.")
+        if position > end:
+            raise ValueError('Truncated protobuf message.')
+        yield key >> 3, wire_type, start, value, position
+
+def _read_varint(view, position, end):
+    value = 0
+    shift = 0
+    while position < end and shift < 64:
+        byte = view[position]
+        position += 1
+        value |= (byte & 0x7f) << shift
+        if byte < 0x80:
+            return value, position
+        shift += 7
+    raise ValueError('Truncated protobuf message.' if position >= end else \
+        'Invalid protobuf varint.')
+
+def _varint(value):
+    data = bytearray()
+    while value >= 0x80:
+        data.append((value & 0x7f) | 0x80)
+        value >>= 7
+    data.append(value)
+    return data
+
+def _message(field, data):
+    return _varint((field << 3) | 2) + _varint(len(data)) + data
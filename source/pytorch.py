@@ -0,0 +1,309 @@
+''' PyTorch backend '''
+
+import itertools
+import json
+import math
+import urllib.parse
+import weakref
+
+import torch # pylint: disable=import-error
+
+class ModelFactory: # pylint: disable=too-few-public-methods
+    ''' PyTorch backend model factory '''
+
+    _models = weakref.WeakKeyDictionary()
+
+    def open(self, model): # pylint: disable=missing-function-docstring
+        # Conversions are reused while the module and its parameters are unchanged.
+        version = _version(model)
+        try:
+            cached = self._models.get(model)
+        except TypeError:
+            cached = None
+        if cached is not None and cached.version == version:
+            return cached
+        result = _Model(model, version)
+        try:
+            self._models[model] = result
+        except TypeError:
+            pass
+        return result
+
+class _Model:
+    def __init__(self, model, version):
+        ''' Convert TorchScript graph to JSON message, keeping parameters by reference '''
+        self.version = version
+        self.tensors = {}
+        module = None
+        graph = model
+        if isinstance(model, torch.nn.Module):
+            module = model
+            if not isinstance(module, torch.jit.ScriptModule):
+                module = torch.jit.script(module)
+            graph = module.inlined_graph
+        self.graph = _Graph(graph, module, self.tensors)
+
+    def to_json(self): # pylint: disable=missing-function-docstring
+        json_model = self._header()
+        json_model['graphs'] = [ self.graph.to_json() ]
+        return json_model
+
+    def to_json_stream(self):
+        ''' Serialize model to compact JSON text chunks, one node at a time '''
+        header = json.dumps(self._header(), ensure_ascii=False, separators=(',', ':'))
+        return itertools.chain([ header[:-1] + ',"graphs":[' ], self.graph.to_json_stream(),
+            [ ']}' ])
+
+    def tensor(self, name, base_dir='.'): # pylint: disable=unused-argument
+        ''' Return payload of parameter as byte buffer sharing the tensor storage '''
+        tensor = self.tensors.get(name)
+        if tensor is None:
+            return None
+        tensor = tensor.detach()
+        if tensor.is_quantized:
+            tensor = tensor.int_repr()
+        if tensor.device.type != 'cpu':
+            tensor = tensor.cpu()
+        tensor = tensor.contiguous()
+        if tensor.dtype == torch.bfloat16:
+            tensor = tensor.view(torch.int16)
+        return memoryview(tensor.numpy()).cast('B')
+
+    @staticmethod
+    def _header():
+        return {
+            'signature': 'netron:pytorch',
+            'format': 'TorchScript',
+            'producer': 'PyTorch v' + torch.__version__
+        }
+
+class _Graph:
+    def __init__(self, graph, module, tensors):
+        self.tensors = tensors
+        self.arguments_index = {}
+        self.arguments = []
+        self.attributes = {}
+        self.constants = set()
+        self.lists = set()
+        self.json_graph = { 'nodes': [], 'inputs': [], 'outputs': [], 'arguments': self.arguments }
+        self._convert(graph, module)
+
+    def to_json(self): # pylint: disable=missing-function-docstring
+        return self.json_graph
+
+    def to_json_stream(self):
+        ''' Serialize graph to compact JSON text chunks '''
+        separators = (',', ':')
+        json_graph = self.json_graph
+        yield '{"nodes":['
+        for i, json_node in enumerate(json_graph['nodes']):
+            yield (',' if i > 0 else '') + \
+                json.dumps(json_node, ensure_ascii=False, separators=separators)
+        yield '],"inputs":' + json.dumps(json_graph['inputs'], ensure_ascii=False) + \
+            ',"outputs":' + json.dumps(json_graph['outputs'], ensure_ascii=False) + \
+            ',"arguments":['
+        for i, argument in enumerate(self.arguments):
+            yield (',' if i > 0 else '') + \
+                json.dumps(argument, ensure_ascii=False, separators=separators)
+        yield ']}'
+
+    def _convert(self, graph, module):
+        inputs = list(graph.inputs())
+        if module is not None and inputs and inputs[0].type().kind() == 'ClassType':
+            self.attributes[inputs[0].unique()] = (module, '')
+            inputs = inputs[1:]
+        for value in inputs:
+            self.json_graph['inputs'].append({
+                'name': value.debugName(),
+                'arguments': [ self.argument(value) ]
+            })
+        nodes = []
+        for node in graph.nodes():
+            kind = node.kind()
+            if kind == 'prim::GetAttr':
+                parent = self.attributes.get(node.input().unique())
+                if parent is not None:
+                    name = node.s('name')
+                    path = parent[1] + '.' + name if parent[1] else name
+                    self.attributes[node.output().unique()] = (getattr(parent[0], name), path)
+                    continue
+            elif kind == 'prim::Constant':
+                self.constants.add(node.output().unique())
+                continue
+            elif kind == 'prim::ListConstruct' and \
+                all(_.unique() in self.constants and not _tensor_type(_) for _ in node.inputs()):
+                self.lists.add(node.output().unique())
+                continue
+            nodes.append(node)
+        for node in nodes:
+            self.json_graph['nodes'].append(self._node(node))
+        for value in graph.outputs():
+            self.json_graph['outputs'].append({
+                'name': value.debugName(),
+                'arguments': [ self.argument(value) ]
+            })
+        # Modules are not referenced after conversion, cached models must not keep them alive.
+        self.attributes.clear()
+
+    def _node(self, node):
+        kind = node.kind()
+        json_node_type = { 'name': kind }
+        category = _categories.get(kind.split('::')[-1])
+        if category:
+            json_node_type['category'] = category
+        json_node = { 'type': json_node_type, 'inputs': [], 'outputs': [], 'attributes': [] }
+        names = _schema(node)
+        for i, value in enumerate(node.inputs()):
+            name = names[i] if names and i < len(names) else 'input'
+            unique = value.unique()
+            if unique in self.lists:
+                json_node['attributes'].append({
+                    'name': name,
+                    'value': [ _value(_.toIValue()) for _ in value.node().inputs() ]
+                })
+            elif unique in self.constants and not _tensor_type(value):
+                json_node['attributes'].append({ 'name': name, 'value': _value(value.toIValue()) })
+            else:
+                json_node['inputs'].append({ 'name': name, 'arguments': [ self.argument(value) ] })
+        for value in node.outputs():
+            json_node['outputs'].append({ 'name': 'output', 'arguments': [ self.argument(value) ] })
+        return json_node
+
+    def argument(self, value): # pylint: disable=missing-function-docstring
+        unique = value.unique()
+        if unique not in self.arguments_index:
+            json_argument = { 'name': value.debugName() }
+            tensor = None
+            if unique in self.attributes:
+                tensor, name = self.attributes[unique]
+                json_argument['name'] = name
+            elif unique in self.constants:
+                tensor = value.toIValue()
+                name = json_argument['name']
+            if isinstance(tensor, torch.Tensor):
+                json_argument['initializer'] = self._tensor(tensor, name)
+            else:
+                json_type = _tensor_type(value)
+                if json_type:
+                    json_argument['type'] = json_type
+            self.arguments_index[unique] = len(self.arguments)
+            self.arguments.append(json_argument)
+        return self.arguments_index[unique]
+
+    def _tensor(self, tensor, name):
+        self.tensors[name] = tensor
+        data_type = str(tensor.dtype).rsplit('.', maxsplit=1)[-1]
+        json_tensor = {
+            'type': {
+                'dataType': _data_types.get(tensor.dtype, data_type),
+                'shape': { 'dimensions': list(tensor.shape) }
+            },
+            'byteSize': tensor.numel() * tensor.element_size(),
+            'location': 'tensors/' + urllib.parse.quote(name, safe='')
+        }
+        if tensor.numel() <= 16 and tensor.device.type == 'cpu' and \
+            tensor.dtype in _data_types and tensor.dtype != torch.bfloat16:
+            values = tensor.detach().reshape(-1).tolist()
+            if all(not isinstance(_, float) or math.isfinite(_) for _ in values):
+                json_tensor['layout'] = '|'
+                json_tensor['values'] = values
+        return json_tensor
+
+def _version(model):
+    ''' Return parameter and buffer metadata and in-place modification counters of module '''
+    if not isinstance(model, torch.nn.Module):
+        return None
+    tensors = itertools.chain(model.named_parameters(), model.named_buffers())
+    return tuple((name, tensor.dtype, tuple(tensor.shape),
+        tensor._version) for name, tensor in tensors) # pylint: disable=protected-access
+
+def _tensor_type(value):
+    value_type = value.type()
+    if value_type.kind() != 'TensorType':
+        return None
+    scalar_type = value_type.scalarType()
+    json_type = { 'dataType': _scalar_types.get(scalar_type, scalar_type or '?') }
+    try:
+        sizes = value_type.sizes()
+    except RuntimeError:
+        sizes = None
+    if sizes is not None:
+        json_type['shape'] = { 'dimensions': list(sizes) }
+    return json_type
+
+def _value(value):
+    if isinstance(value, (list, tuple)):
+        return [ _value(_) for _ in value ]
+    if isinstance(value, float) and not math.isfinite(value):
+        return str(value)
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    return str(value)
+
+_schemas = {}
+
+def _schema(node):
+    ''' Return argument names from operator schema, None for nodes without schema '''
+    try:
+        schema = node.schema()
+    except RuntimeError:
+        return None
+    if schema not in _schemas:
+        names = None
+        if '(' in schema and ') ->' in schema:
+            text = schema[schema.index('(') + 1:schema.rindex(') ->')]
+            names = []
+            depth = 0
+            start = 0
+            for i, char in enumerate(text + ','):
+                depth += 1 if char in '([' else -1 if char in ')]' else 0
+                if char == ',' and depth == 0:
+                    declaration = text[start:i].split('=', 1)[0].strip()
+                    if declaration and declaration != '*':
+                        names.append(declaration.split(' ')[-1])
+                    start = i + 1
+        _schemas[schema] = names
+    return _schemas[schema]
+
+_data_types = {
+    torch.float16: 'float16',
+    torch.bfloat16: 'bfloat16',
+    torch.float32: 'float32',
+    torch.float64: 'float64',
+    torch.uint8: 'uint8',
+    torch.int8: 'int8',
+    torch.int16: 'int16',
+    torch.int32: 'int32',
+    torch.int64: 'int64',
+    torch.bool: 'boolean'
+}
+
+_scalar_types = {
+    'Half': 'float16',
+    'BFloat16': 'bfloat16',
+    'Float': 'float32',
+    'Double': 'float64',
+    'Byte': 'uint8',
+    'Char': 'int8',
+    'Short': 'int16',
+    'Int': 'int32',
+    'Long': 'int64',
+    'Bool': 'boolean'
+}
+
+_categories = dict((name, category) for category, names in {
+    'Layer': [ 'conv1d', 'conv2d', 'conv3d', 'conv_transpose1d', 'conv_transpose2d',
+        'conv_transpose3d', '_convolution', 'linear', 'addmm', 'embedding', 'lstm', 'gru',
+        'scaled_dot_product_attention' ],
+    'Activation': [ 'relu', 'relu_', 'relu6', 'gelu', 'silu', 'silu_', 'sigmoid', 'tanh',
+        'hardtanh', 'hardtanh_', 'hardswish', 'hardswish_', 'hardsigmoid', 'leaky_relu', 'elu',
+        'prelu', 'softmax', 'log_softmax' ],
+    'Pool': [ 'max_pool1d', 'max_pool2d', 'max_pool3d', 'avg_pool1d', 'avg_pool2d', 'avg_pool3d',
+        'adaptive_avg_pool1d', 'adaptive_avg_pool2d', 'adaptive_avg_pool3d',
+        'adaptive_max_pool2d' ],
+    'Normalization': [ 'batch_norm', 'layer_norm', 'group_norm', 'instance_norm' ],
+    'Dropout': [ 'dropout', 'dropout_', 'feature_dropout' ],
+    'Shape': [ 'view', 'reshape', 'flatten', 'squeeze', 'unsqueeze', 'permute', 'transpose',
+        'contiguous', 'size' ],
+    'Tensor': [ 'cat', 'stack', 'split', 'chunk', 'slice', 'select', 'index', 'gather' ]
+}.items() for name in names)
@@ -22,15 +22,26 @@ message.ModelFactory = class {
     }
 
     open(context, match) {
+        const graph = Array.isArray(match.graphs) && match.graphs.length === 1 ? match.graphs[0] : null;
+        const count = graph && graph.nodes ? (Array.isArray(graph.nodes) ? graph.nodes : graph.nodes.type).length : 0;
+        // Layout coordinates are indexed by node of the full graph, not of a collapsed one.
+        if (count > 3000 && !graph.blocks) {
+            return context.request('graph/layout', 'utf-8').then((text) => {
+                graph.layout = JSON.parse(text);
+                return new message.Model(match, context);
+            }).catch(() => {
+                return new message.Model(match, context);
+            });
+        }
         return Promise.resolve().then(() => {
-            return new message.Model(match);
+            return new message.Model(match, context);
         });
     }
 };
 
 message.Model = class {
 
-    constructor(data) {
+    constructor(data, context) {
         this._format = data.format || '';
         this._producer = data.producer || '';
         this._version = data.version || '';
@@ -38,7 +49,7 @@ message.Model = class {
         this._metadata = (data.metadata || []).map((entry) => {
             return { name: entry.name, value: entry.value };
         });
-        this._graphs = (data.graphs || []).map((graph) => new message.Graph(graph));
+        this._graphs = (data.graphs || []).map((graph) => new message.Graph(graph, context));
     }
 
     get format() {
@@ -64,15 +75,30 @@ message.Model = class {
     get graphs() {
         return this._graphs;
     }
+
+    update(types) {
+        for (const graph of this._graphs) {
+            graph.update(types);
+        }
+    }
 };
 
 message.Graph = class {
 
-    constructor(data) {
+    constructor(data, context) {
         this._inputs = [];
         this._outputs = [];
         this._nodes = [];
-        const args = data.arguments ? data.arguments.map((argument) => new message.Argument(argument)) : [];
+        this._layout = data.layout || null;
+        this._context = context;
+        this._blocks = new Map();
+        this._types = null;
+        if (data.nodes && !Array.isArray(data.nodes)) {
+            this._columns(data, context);
+            return;
+        }
+        const args = data.arguments ? data.arguments.map((argument) => new message.Argument(argument, context)) : [];
+        this._arguments = args;
         for (const parameter of data.inputs || []) {
             parameter.arguments = parameter.arguments.map((index) => args[index]).filter((argument) => !argument.initializer);
             if (parameter.arguments.filter((argument) => !argument.initializer).length > 0) {
@@ -96,6 +122,81 @@ message.Graph = class {
         }
     }
 
+    _columns(data, context) {
+        // Nodes are stored as columns with inputs, outputs and attributes as offset ranges into index arrays.
+        const names = data.arguments.name;
+        const args = names.map((name) => new message.Argument({ name: name }));
+        for (const [index, initializer] of data.arguments.initializers) {
+            args[index] = new message.Argument({ name: names[index], initializer: initializer }, context);
+        }
+        this._arguments = args;
+        const nodes = data.nodes;
+        const parameters = (column, index) => {
+            const parameters = [];
+            for (let i = column.offsets[index]; i < column.offsets[index + 1]; i++) {
+                parameters.push({ name: 'X', arguments: [ args[column.values[i]] ] });
+            }
+            return parameters;
+        };
+        for (let i = 0; i < nodes.type.length; i++) {
+            const attributes = nodes.attributes.values.slice(nodes.attributes.offsets[i], nodes.attributes.offsets[i + 1]).map((index) => data.attributes[index]);
+            const node = new message.Node({
+                type: nodes.types[nodes.type[i]],
+                name: nodes.name[i],
+                inputs: parameters(nodes.inputs, i),
+                outputs: parameters(nodes.outputs, i),
+                attributes: attributes
+            });
+            if (data.blocks && node.type.name === 'Block') {
+                // Repeats of a block are collapsed to a single node standing for a node range.
+                const start = attributes.find((attribute) => attribute.name === 'start');
+                const length = attributes.find((attribute) => attribute.name === 'length');
+                if (start && length) {
+                    this._blocks.set(node, { start: start.value, length: length.value });
+                }
+            }
+            this._nodes.push(node);
+        }
+    }
+
+    expandable(node) {
+        return this._blocks.has(node);
+    }
+
+    expand(node) {
+        // The nodes of a collapsed block are requested relative to the model and replace the block node.
+        const block = this._blocks.get(node);
+        if (!block || !this._context) {
+            return Promise.resolve();
+        }
+        return this._context.request('graph/nodes?start=' + block.start + '&count=' + block.length, 'utf-8').then((text) => {
+            const graph = new message.Graph(JSON.parse(text), this._context);
+            const index = this._nodes.indexOf(node);
+            if (index !== -1 && this._blocks.delete(node)) {
+                this._nodes.splice(index, 1, ...graph.nodes);
+                this._arguments = this._arguments.concat(graph._arguments);
+                if (this._types) {
+                    graph.update(this._types);
+                }
+            }
+        });
+    }
+
+    get layout() {
+        return this._layout;
+    }
+
+    update(types) {
+        // Inferred value types arrive after the graph was rendered.
+        this._types = types;
+        for (const argument of this._arguments) {
+            const type = types[argument.name];
+            if (type) {
+                argument.type = new message.TensorType(type);
+            }
+        }
+    }
+
     get inputs() {
         return this._inputs;
     }
@@ -131,10 +232,10 @@ message.Parameter = class {
 
 message.Argument = class {
 
-    constructor(data) {
+    constructor(data, context) {
         this._name= data.name || '';
         this._type = data.type ? new message.TensorType(data.type) : null;
-        this._initializer = data.initializer ? new message.Tensor(data.initializer) : null;
+        this._initializer = data.initializer ? new message.Tensor(data.initializer, context) : null;
     }
 
     get name() {
@@ -148,6 +249,10 @@ message.Argument = class {
         return this._type;
     }
 
+    set type(value) {
+        this._type = value;
+    }
+
     get initializer() {
         return this._initializer;
     }
@@ -213,7 +318,7 @@ message.TensorType = class {
 
     constructor(data) {
         this._dataType = data.dataType;
-        this._shape = new message.TensorShape(data.shape);
+        this._shape = data.shape ? new message.TensorShape(data.shape) : null;
     }
 
     get dataType() {
@@ -225,7 +330,7 @@ message.TensorType = class {
     }
 
     toString() {
-        return this._dataType + this._shape.toString();
+        return this._dataType + (this._shape ? this._shape.toString() : '');
     }
 };
 
@@ -246,7 +351,50 @@ message.TensorShape = class {
 
 message.Tensor = class {
 
-    constructor() {
+    constructor(data, context) {
+        this._type = data.type ? new message.TensorType(data.type) : null;
+        this._layout = data.layout;
+        this._values = data.values;
+        this._byteSize = data.byteSize;
+        this._location = data.location || '';
+        this._context = context;
+    }
+
+    fetch() {
+        // Large tensors are sent without values, the raw little-endian data is requested relative to the model.
+        if (this._values !== undefined || !this._location || !this._context) {
+            return null;
+        }
+        if (!this._request) {
+            this._request = this._context.request(this._location, null).then((stream) => {
+                this._values = stream.peek();
+                this._layout = '<';
+            }).catch((error) => {
+                delete this._request;
+                throw error;
+            });
+        }
+        return this._request;
+    }
+
+    get type() {
+        return this._type;
+    }
+
+    get layout() {
+        return this._layout;
+    }
+
+    get values() {
+        return this._values;
+    }
+
+    get byteSize() {
+        return this._byteSize;
+    }
+
+    get location() {
+        return this._location;
     }
 };
 
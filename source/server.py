@@ -1,48 +1,569 @@
 ''' Python Server implementation '''
 
+# pylint: disable=too-many-lines
+
+import asyncio
+import collections
+import concurrent.futures
+import email.utils
 import errno
+import hashlib
+import http.client
 import http.server
+import io
 import importlib.util
 import json
+import mmap
 import os
+import queue
 import random
 import re
+import selectors
+import signal
 import socket
-import socketserver
 import sys
+import tempfile
 import threading
 import time
 import webbrowser
 import urllib.parse
+import zlib
 
 __version__ = '0.0.0'
 
-class _ContentProvider: # pylint: disable=too-few-public-methods
+class _Content: # pylint: disable=too-few-public-methods,too-many-instance-attributes
+    def __init__(self, size, mtime, buffer=None, filename=None, etag=None, offset=0): # pylint: disable=too-many-arguments,too-many-positional-arguments,line-too-long
+        self.size = size
+        self.mtime = mtime
+        self.buffer = buffer
+        self.filename = filename
+        # Offset of content in file, tensors are served from a slice of the weights file.
+        self.offset = offset
+        self.etag = etag if etag else \
+            '"' + format(int(mtime * 1000), 'x') + '-' + format(size, 'x') + '"'
+        self.compressible = False
+        self.gzip = None
+        # Compression is done once per content, other content compresses in parallel.
+        self.lock = threading.Lock()
+
+    def compress(self):
+        ''' Return gzip encoded variant, compressed once on first use '''
+        if self.gzip is None and self.compressible:
+            with self.lock:
+                if self.gzip is None:
+                    data = _spill(_gzip(self._chunks()))
+                    self.gzip = _Content(len(data), self.mtime, buffer=data,
+                        etag=self.etag[:-1] + '-gzip"')
+        return self.gzip
+
+    def _chunks(self):
+        size = 1024 * 1024
+        if self.filename:
+            with open(self.filename, 'rb') as file:
+                file.seek(self.offset)
+                for offset in range(0, self.size, size):
+                    yield file.read(min(size, self.size - offset))
+        else:
+            with memoryview(self.buffer) as view:
+                for offset in range(0, self.size, size):
+                    yield view[offset:offset + size]
+
+    def write(self, connection, offset, count):
+        ''' Write byte range to socket without copying into memory '''
+        if self.filename:
+            with open(self.filename, 'rb') as file:
+                connection.sendfile(file, self.offset + offset, count)
+        else:
+            with memoryview(self.buffer) as view:
+                connection.sendall(view[offset:offset + count])
+
+    async def write_async(self, writer, offset, count):
+        ''' Write byte range to asyncio stream, reading files off the event loop '''
+        if self.filename:
+            await writer.drain()
+            loop = asyncio.get_running_loop()
+            with open(self.filename, 'rb') as file:
+                await loop.sendfile(writer.transport, file, self.offset + offset, count)
+        else:
+            size = 1024 * 1024
+            with memoryview(self.buffer) as view:
+                for position in range(offset, offset + count, size):
+                    writer.write(view[position:min(position + size, offset + count)])
+                    await writer.drain()
+
+class _AssetCache: # pylint: disable=too-few-public-methods
+    compressible = { '.html', '.js', '.css', '.json', '.svg' }
+    def __init__(self, root):
+        self.root = root
+        self.lock = threading.Lock()
+        self.entries = {}
+
+    def open(self, path, extensions):
+        ''' Return cached static asset, reloaded when modification time or size changed '''
+        entry = self.entries.get(path)
+        if entry:
+            filename, content = entry
+            try:
+                stat = os.stat(filename)
+                if stat.st_mtime == content.mtime and stat.st_size == content.size:
+                    return content
+            except OSError:
+                pass
+        filename = os.path.normpath(os.path.realpath(self.root + path))
+        extension = os.path.splitext(filename)[1]
+        if os.path.commonprefix([ self.root, filename ]) == self.root and \
+            os.path.exists(filename) and not os.path.isdir(filename) and \
+            extension in extensions:
+            with open(filename, 'rb') as file:
+                stat = os.fstat(file.fileno())
+                data = file.read()
+            content = _Content(len(data), stat.st_mtime, buffer=data, etag=_etag(data))
+            content.compressible = extension in self.compressible
+            gzip_filename = filename + '.gz'
+            if content.compressible and os.path.exists(gzip_filename) and \
+                os.path.getmtime(gzip_filename) >= stat.st_mtime:
+                with open(gzip_filename, 'rb') as file:
+                    data = file.read()
+                content.gzip = _Content(len(data), stat.st_mtime, buffer=data,
+                    etag=content.etag[:-1] + '-gzip"')
+            content.compress()
+            with self.lock:
+                self.entries[path] = (filename, content)
+            return content
+        return None
+
+class _ConversionCache:
+    ''' Content-addressed on-disk cache of gzip compressed model conversions '''
+    def __init__(self, directory, size_limit):
+        self.directory = directory
+        self.size_limit = size_limit
+
+    def get(self, key):
+        ''' Return cached data as read-only mmap, None if not cached '''
+        filename = os.path.join(self.directory, key + '.json.gz')
+        try:
+            with open(filename, 'rb') as file:
+                buffer = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+            os.utime(filename)
+            return buffer
+        except (OSError, ValueError):
+            return None
+
+    def put(self, key, buffer):
+        ''' Store data atomically and evict least recently used entries beyond size limit '''
+        filename = os.path.join(self.directory, key + '.json.gz')
+        temp_filename = None
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            with tempfile.NamedTemporaryFile(dir=self.directory, delete=False) as file:
+                temp_filename = file.name
+                file.write(buffer)
+            os.replace(temp_filename, filename)
+            self._evict()
+        except OSError:
+            if temp_filename and os.path.exists(temp_filename):
+                os.remove(temp_filename)
+
+    def _evict(self):
+        entries = []
+        with os.scandir(self.directory) as iterator:
+            for entry in iterator:
+                if entry.name.endswith('.json.gz'):
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+        size = sum(_[1] for _ in entries)
+        for _, entry_size, path in sorted(entries):
+            if size <= self.size_limit:
+                break
+            try:
+                os.remove(path)
+                size -= entry_size
+            except OSError:
+                pass
+
+class _ContentProvider: # pylint: disable=too-few-public-methods,too-many-instance-attributes
     data = bytearray()
     base_dir = ''
     base = ''
     title = ''
-    def __init__(self, data, path, file):
+    spill_size = 16 * 1024 * 1024
+    window_size = 10000
+    collapse_size = 3000
+    shapes_timeout = 300
+    def __init__(self, data, path, file, compressible=False, model=None): # pylint: disable=too-many-arguments
         self.data = data if data else bytearray()
         self.title = os.path.basename(file) if file else ''
+        self.model = model
+        self.model_dir = os.path.dirname(file) if file and os.path.dirname(file) else '.'
+        self.key = None
+        self.layout = None
+        self.collapsed = None
+        self.shapes = None
+        self.shapes_error = None
+        self.inference = None
+        self.lock = threading.Lock()
+        self.mtime = time.time()
+        self.index_cache = (None, None)
+        self.content = None
+        if len(self.data) > self.spill_size and not isinstance(self.data, mmap.mmap):
+            self.data = _spill([ self.data ], self.spill_size)
+        if self.data:
+            self.content = _Content(len(self.data), self.mtime, buffer=self.data)
+            self.content.compressible = compressible
         if path:
             self.dir = os.path.dirname(path) if os.path.dirname(path) else '.'
             self.base = os.path.basename(path)
-    def read(self, path):
-        ''' Read content '''
-        if path == self.base and self.data:
-            return self.data
+    def size(self):
+        ''' Size of model data held by provider '''
+        return len(self.data)
+    def file(self):
+        ''' URL path of the model document, large graphs load with repeated blocks collapsed '''
+        file = '/data/' + urllib.parse.quote(self.base)
+        return file + '?view=collapsed' if hasattr(self.model, 'collapsed') else file
+    def open(self, path, query=None):
+        ''' Open content for streaming '''
+        if path == self.base and self.content:
+            if query and query.get('view') == [ 'collapsed' ]:
+                return self._collapsed()
+            return self.content
+        if self.model and path.startswith('tensors/'):
+            value = self.model.tensor(path[len('tensors/'):], self.model_dir)
+            if isinstance(value, tuple):
+                filename, offset, length = value
+                return _Content(length, os.stat(filename).st_mtime, filename=filename,
+                    offset=offset)
+            return _Content(len(value), self.mtime, buffer=value) if value is not None else None
         base_dir = os.path.realpath(self.dir)
         filename = os.path.normpath(os.path.realpath(base_dir + '/' + path))
         if os.path.commonprefix([ base_dir, filename ]) == base_dir:
             if os.path.exists(filename) and not os.path.isdir(filename):
-                with open(filename, 'rb') as file:
-                    return file.read()
+                stat = os.stat(filename)
+                return _Content(stat.st_size, stat.st_mtime, filename=filename)
         return None
+    def window(self, path, query):
+        ''' Serialize node range, neighborhood, layout or value types of graph as JSON content,
+        raises ValueError for malformed query values and RuntimeError if inference failed '''
+        if path in ('layout', 'shapes'):
+            if path == 'shapes' and self.shapes_error:
+                raise RuntimeError(self.shapes_error)
+            return self._layout() if path == 'layout' else self.shapes
+        if not hasattr(self.model, 'neighborhood'):
+            return None
+        try:
+            if path == 'nodes':
+                first = _integer(query, 'start', 0)
+                count = min(_integer(query, 'count', 1000), self.window_size)
+                value = self.model.nodes(first, count)
+            elif path == 'collapsed':
+                value = self.model.collapsed()
+            elif path == 'neighborhood':
+                node = _integer(query, 'node', None)
+                tensor = query['tensor'][0] if 'tensor' in query else None
+                hops = min(_integer(query, 'hops', 1), 16)
+                value = self.model.neighborhood(node, tensor, hops)
+            else:
+                return None
+        except ImportError:
+            return None
+        if value is None:
+            # The collapsed model document is the full document if nothing repeats.
+            return self.content if path == 'collapsed' else None
+        data = json.dumps(value, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        content = _Content(len(data), self.mtime, buffer=data, etag=_etag(data))
+        content.compressible = True
+        return content
 
-class _HTTPRequestHandler(http.server.BaseHTTPRequestHandler):
-    content = None
-    verbosity = 1
+    def infer(self, callback):
+        ''' Start shape inference once on a worker thread, callback is called when done '''
+        with self.lock:
+            if self.inference is not None or not hasattr(self.model, 'shapes'):
+                return
+            self.inference = threading.Thread(target=self._infer, args=(callback,), daemon=True)
+            self.inference.start()
+
+    def _infer(self, callback):
+        key = self.key + '-shapes' if self.key else None
+        def generate():
+            shapes = self.model.shapes(self.shapes_timeout)
+            yield json.dumps(shapes, ensure_ascii=False, separators=(',', ':'))
+        try:
+            data, gzip = _cached(key, generate)
+        except Exception as error: # pylint: disable=broad-exception-caught
+            self.shapes_error = str(error) or type(error).__name__
+            return
+        content = _Content(len(data), self.mtime, buffer=data, etag=_etag(data))
+        content.compressible = True
+        _cache_gzip(key, content, gzip)
+        self.shapes = content
+        callback()
+
+    def _collapsed(self):
+        ''' Model document with repeated blocks collapsed, the full document for graphs up to
+        collapse_size nodes or without repeats '''
+        if self.collapsed is None and self.content:
+            value = None
+            if hasattr(self.model, 'collapsed'):
+                try:
+                    value = self.model.collapsed(self.collapse_size)
+                except ImportError:
+                    value = None
+            if value is None:
+                self.collapsed = self.content
+            else:
+                data = json.dumps(value, ensure_ascii=False, separators=(',', ':'))
+                data = data.encode('utf-8')
+                self.collapsed = _Content(len(data), self.mtime, buffer=data, etag=_etag(data))
+                self.collapsed.compressible = True
+        return self.collapsed
+
+    def _layout(self):
+        if self.layout is None and hasattr(self.model, 'layout'):
+            key = self.key + '-layout' if self.key else None
+            def generate():
+                yield json.dumps(self.model.layout(), separators=(',', ':'))
+            try:
+                data, gzip = _cached(key, generate)
+            except ImportError:
+                return None
+            content = _Content(len(data), self.mtime, buffer=data, etag=_etag(data))
+            content.compressible = True
+            _cache_gzip(key, content, gzip)
+            self.layout = content
+        return self.layout
+
+    def index(self, asset):
+        ''' Render index.html with model meta tags, cached per source asset '''
+        source, content = self.index_cache
+        if source is asset:
+            return content
+        text = bytes(asset.buffer).decode('utf-8')
+        meta = [
+            '<meta name="type" content="Python">',
+            '<meta name="version" content="' + __version__ + '">'
+        ]
+        if self.base:
+            meta.append('<meta name="file" content="' + self.file() + '">')
+            text = re.sub(r'<title>.*</title>', '<title>' + self.title + '</title>', text)
+        meta = '\n'.join(meta)
+        text = re.sub(r'<meta name="version" content=".*">', meta, text)
+        data = text.encode('utf-8')
+        content = _Content(len(data), asset.mtime, buffer=data, etag=_etag(data))
+        content.compressible = True
+        self.index_cache = (asset, content)
+        return content
+
+class _ModelRegistry:
+    def __init__(self, budget, verbosity):
+        self.budget = budget
+        self.verbosity = verbosity
+        self.lock = threading.Lock()
+        self.entries = collections.OrderedDict()
+
+    def add(self, name, file, data):
+        ''' Register model, content is created on first access '''
+        with self.lock:
+            self.entries[name] = self._entry(file, data, None)
+
+    def replace(self, name, file, data, content):
+        ''' Swap converted content of registered model, returns False if not registered '''
+        with self.lock:
+            if name not in self.entries:
+                return False
+            self.entries[name] = self._entry(file, data, content)
+            self.entries.move_to_end(name)
+            self._evict(name)
+            return True
+
+    def contains(self, name):
+        ''' Is model registered '''
+        with self.lock:
+            return name in self.entries
+
+    def remove(self, name):
+        ''' Unregister model, returns False if not registered '''
+        with self.lock:
+            return self.entries.pop(name, None) is not None
+
+    def list(self):
+        ''' List registered models '''
+        with self.lock:
+            return [ {
+                'name': name,
+                'file': entry['file'],
+                'loaded': entry['content'] is not None
+            } for name, entry in self.entries.items() ]
+
+    def get(self, name):
+        ''' Return content for model, loading it and evicting least recently used models '''
+        with self.lock:
+            entry = self.entries.get(name)
+            if entry is None:
+                return None
+            self.entries.move_to_end(name)
+            content = entry['content']
+        if content is None:
+            # Concurrent first requests wait for a single conversion.
+            with entry['loading']:
+                content = entry['content']
+                if content is None and entry['error'] is None:
+                    try:
+                        content = _content(entry['file'], entry['data'], self.verbosity)
+                    except Exception as error: # pylint: disable=broad-exception-caught
+                        # Failed models are not converted again until replaced.
+                        entry['error'] = type(error).__name__ + \
+                            (': ' + str(error) if str(error) else '')
+                        _log(self.verbosity > 0, "Failed to load '" + name + "': " + \
+                            entry['error'] + '\n')
+                        return None
+                    with self.lock:
+                        entry['content'] = content
+                        self._evict(name)
+        return content
+
+    def error(self, name):
+        ''' Return conversion error of model, None if not registered or not failed '''
+        with self.lock:
+            entry = self.entries.get(name)
+            return entry['error'] if entry else None
+
+    @staticmethod
+    def _entry(file, data, content):
+        return { 'file': file, 'data': data, 'content': content, 'error': None,
+            'loading': threading.Lock() }
+
+    def _evict(self, current):
+        size = sum(_['content'].size() for _ in self.entries.values() if _['content'])
+        for name, entry in self.entries.items():
+            if size <= self.budget:
+                break
+            if name != current and entry['content']:
+                _log(self.verbosity > 1, "Evicting '" + name + "'\n")
+                size -= entry['content'].size()
+                entry['content'] = None
+
+class _Subscription:
+    def __init__(self, events, name):
+        self.events = events
+        self.name = name
+        self.items = collections.deque()
+        self.condition = threading.Condition()
+        self.loop = None
+        self.event = None
+
+    def put(self, item):
+        ''' Queue event, False closes the subscription '''
+        with self.condition:
+            self.items.append(item)
+            self.condition.notify()
+        if self.loop:
+            self.loop.call_soon_threadsafe(self.event.set)
+
+    def close(self):
+        ''' Stop receiving events '''
+        self.events.unsubscribe(self)
+
+    def get(self, timeout):
+        ''' Wait for next event, returns None after timeout '''
+        with self.condition:
+            if not self.items:
+                self.condition.wait(timeout)
+            return self.items.popleft() if self.items else None
+
+    async def get_async(self, timeout):
+        ''' Wait for next event without blocking the event loop '''
+        if self.loop is None:
+            self.event = asyncio.Event()
+            self.loop = asyncio.get_running_loop()
+        while not self.items:
+            try:
+                await asyncio.wait_for(self.event.wait(), timeout)
+            except asyncio.TimeoutError:
+                return None
+            self.event.clear()
+        with self.condition:
+            return self.items.popleft()
+
+class _Events:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.subscriptions = set()
+
+    def subscribe(self, name):
+        ''' Subscribe to events for model name, None for the default model '''
+        subscription = _Subscription(self, name)
+        with self.lock:
+            self.subscriptions.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        ''' Remove subscription '''
+        with self.lock:
+            self.subscriptions.discard(subscription)
+
+    def publish(self, name, event, data):
+        ''' Send event to all pages showing model name '''
+        with self.lock:
+            subscriptions = [ _ for _ in self.subscriptions if _.name == name ]
+        for subscription in subscriptions:
+            subscription.put((event, data))
+
+    def close(self):
+        ''' End all event streams '''
+        with self.lock:
+            subscriptions = list(self.subscriptions)
+        for subscription in subscriptions:
+            subscription.put(False)
+
+class _Response: # pylint: disable=too-few-public-methods
+    heartbeat = 15
+    def __init__(self, status_code, headers, content=None, offset=0, count=0): # pylint: disable=too-many-arguments,too-many-positional-arguments,line-too-long
+        self.status_code = status_code
+        self.headers = headers
+        self.content = content
+        self.offset = offset
+        self.count = count
+        self.events = None
+        self.close = False
+
+    def write(self, connection):
+        ''' Write response body to socket '''
+        if self.events:
+            try:
+                while True:
+                    item = self.events.get(self.heartbeat)
+                    if item is False:
+                        break
+                    connection.sendall(self._event(item))
+            except OSError:
+                pass
+            finally:
+                self.events.close()
+        elif self.content and self.count > 0:
+            self.content.write(connection, self.offset, self.count)
+
+    async def write_async(self, writer):
+        ''' Write response body to asyncio stream '''
+        if self.events:
+            try:
+                while True:
+                    item = await self.events.get_async(self.heartbeat)
+                    if item is False:
+                        break
+                    writer.write(self._event(item))
+                    await writer.drain()
+            finally:
+                self.events.close()
+        elif self.content and self.count > 0:
+            await self.content.write_async(writer, self.offset, self.count)
+
+    @staticmethod
+    def _event(item):
+        if item is None:
+            return b': ping\n\n'
+        event, data = item
+        return ('event: ' + event + '\ndata: ' + json.dumps(data) + '\n\n').encode('utf-8')
+
+class _Router: # pylint: disable=too-few-public-methods
     mime_types = {
         '.html': 'text/html',
         '.js':   'text/javascript',
@@ -60,96 +581,490 @@ class _HTTPRequestHandler(http.server.BaseHTTPRequestHandler):
         '.woff2': 'application/font-woff2',
         '.svg': 'image/svg+xml'
     }
+    cache_control = {
+        '.png': 'public, max-age=86400',
+        '.gif': 'public, max-age=86400',
+        '.jpg': 'public, max-age=86400',
+        '.ico': 'public, max-age=86400',
+        '.ttf': 'public, max-age=86400',
+        '.otf': 'public, max-age=86400',
+        '.eot': 'public, max-age=86400',
+        '.woff': 'public, max-age=86400',
+        '.woff2': 'public, max-age=86400',
+        '.svg': 'public, max-age=86400'
+    }
+
+    shapes = { 'file': '/data/graph/shapes' }
+
+    def __init__(self, content, models, verbosity):
+        self.content = content
+        self.models = models
+        self.verbosity = verbosity
+        self.events = _Events()
+
+    def replace(self, name, file, data, content):
+        ''' Swap model content and notify connected pages '''
+        if name is None:
+            self.content = content
+        elif not self.models.replace(name, file, data, content):
+            _log(self.verbosity > 1, "Discarding update of removed model '" + name + "'\n")
+            return
+        self.events.publish(name, 'update', {
+            'file': content.file(),
+            'title': content.title
+        })
+        self.infer(name, content)
+
+    def infer(self, name, content):
+        ''' Start background shape inference, pages showing the model are notified when done '''
+        content.infer(lambda: self.events.publish(name, 'shapes', self.shapes))
+
+    def route(self, method, target, headers):
+        ''' Map GET or HEAD request to response '''
+        url = urllib.parse.urlparse(target)
+        path = url.path
+        name = None
+        provider = self.content
+        response = None
+        if path in ('/models', '/models/'):
+            data = json.dumps(self.models.list()).encode('utf-8')
+            content = _Content(len(data), time.time(), buffer=data, etag=_etag(data))
+            response = self._content(headers, 'application/json', content, 'no-cache')
+        elif path.startswith('/models/'):
+            name, separator, path = path[len('/models/'):].partition('/')
+            name = urllib.parse.unquote(name)
+            provider = self.models.get(name)
+            if provider:
+                self.infer(name, provider)
+            elif self.models.error(name):
+                response = self._text(500, self.models.error(name))
+            if provider and not separator:
+                location = url.path + '/' + ('?' + url.query if url.query else '')
+                response = _Response(301, [ ('Location', location), ('Content-Length', 0) ])
+            path = '/' + path
+        if provider and not response:
+            if path == '/events':
+                response = _Response(200, [
+                    ('Content-Type', 'text/event-stream'),
+                    ('Cache-Control', 'no-cache')
+                ])
+                response.events = self.events.subscribe(name) if method == 'GET' else None
+                response.close = True
+                if response.events and provider.shapes:
+                    # Inference finished before the page subscribed.
+                    response.events.put(('shapes', self.shapes))
+            else:
+                path = '/index.html' if path == '/' else path
+                response = self._provider(headers, provider, path, url.query)
+        if response is None:
+            response_headers = [ ('Content-Type', 'text/plain'), ('Content-Length', 3) ]
+            response = _Response(404, response_headers, _Content(3, 0, b'404'), 0, 3)
+        _log(self.verbosity > 1, str(response.status_code) + ' ' + method + ' ' + target + '\n')
+        return response
+
+    def _provider(self, headers, provider, path, query):
+        if path.startswith('/data/graph/'):
+            try:
+                content = provider.window(path[len('/data/graph/'):], urllib.parse.parse_qs(query))
+            except (ValueError, RuntimeError) as error:
+                # Malformed query values are client errors, failed shape inference is not.
+                return self._text(400 if isinstance(error, ValueError) else 500, str(error))
+            return self._content(headers, 'application/json', content, 'no-cache') \
+                if content else None
+        if path.startswith('/data/'):
+            content = provider.open(urllib.parse.unquote(path[len('/data/'):]),
+                urllib.parse.parse_qs(query))
+            if content:
+                return self._content(headers, 'application/octet-stream', content, 'no-cache')
+            return None
+        content = _assets.open(path, self.mime_types)
+        if content:
+            if path == '/index.html':
+                content = provider.index(content)
+            extension = os.path.splitext(path)[1]
+            return self._content(headers, self.mime_types[extension], content,
+                self.cache_control.get(extension, 'no-cache'))
+        return None
+
+    @staticmethod
+    def _text(status_code, text):
+        data = (text + '\n').encode('utf-8')
+        return _Response(status_code, [ ('Content-Type', 'text/plain; charset=utf-8'),
+            ('Content-Length', len(data)) ], _Content(len(data), 0, data), 0, len(data))
+
+    def _content(self, headers, content_type, content, cache_control):
+        response_headers = [ ('Cache-Control', cache_control), ('Vary', 'Accept-Encoding') ]
+        if content.compressible and not headers.get('Range') and self._accept(headers, 'gzip'):
+            content = content.compress()
+            response_headers.append(('Content-Encoding', 'gzip'))
+        response_headers.append(('ETag', content.etag))
+        if_none_match = headers.get('If-None-Match')
+        if if_none_match and (if_none_match.strip() == '*' or \
+            content.etag in [ _.strip() for _ in if_none_match.split(',') ]):
+            return _Response(304, [ _ for _ in response_headers if _[0] != 'Content-Encoding' ])
+        last_modified = email.utils.formatdate(int(content.mtime), usegmt=True)
+        byte_range = self._range(headers, content, last_modified)
+        if byte_range == 416:
+            return _Response(416, [
+                ('Content-Range', 'bytes */' + str(content.size)),
+                ('Content-Length', 0)
+            ])
+        status_code = 206 if byte_range else 200
+        offset, count = byte_range if byte_range else (0, content.size)
+        response_headers.extend([
+            ('Content-Type', content_type),
+            ('Content-Length', count),
+            ('Accept-Ranges', 'bytes'),
+            ('Last-Modified', last_modified)
+        ])
+        if status_code == 206:
+            last = offset + count - 1
+            response_headers.append(('Content-Range', \
+                'bytes ' + str(offset) + '-' + str(last) + '/' + str(content.size)))
+        return _Response(status_code, response_headers, content, offset, count)
+
+    @staticmethod
+    def _accept(headers, encoding):
+        for item in headers.get('Accept-Encoding', '').split(','):
+            name, _, parameters = item.partition(';')
+            if name.strip().lower() in (encoding, '*'):
+                parameters = parameters.replace(' ', '')
+                return not parameters.startswith('q=') or parameters[2:].strip('0.') != ''
+        return False
+
+    @staticmethod
+    def _range(headers, content, last_modified):
+        ''' Parse single byte range, returns (offset, count), 416 or None for full content '''
+        value = headers.get('Range')
+        if not value or not value.startswith('bytes=') or ',' in value:
+            return None
+        if_range = headers.get('If-Range')
+        if if_range and if_range not in (content.etag, last_modified):
+            return None
+        first, _, last = value[len('bytes='):].strip().partition('-')
+        try:
+            if first:
+                first = int(first)
+                last = int(last) if last else max(content.size - 1, first)
+                if last < first:
+                    # A last position before the first makes the header invalid, it is ignored.
+                    return None
+            else:
+                first = max(content.size - int(last), 0)
+                last = content.size - 1
+        except ValueError:
+            return None
+        if first >= content.size:
+            return 416
+        last = min(last, content.size - 1)
+        return (first, last - first + 1)
+
+class _HTTPRequestHandler(http.server.BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    timeout = 5
+    max_requests = 100
     def do_HEAD(self): # pylint: disable=invalid-name
         ''' Serve a HEAD request '''
         self.do_GET()
     def do_GET(self): # pylint: disable=invalid-name
         ''' Serve a GET request '''
-        path = urllib.parse.urlparse(self.path).path
-        path = '/index.html' if path == '/' else path
-        status_code = 404
-        content = None
-        content_type = None
-        if path.startswith('/data/'):
-            path = urllib.parse.unquote(path[len('/data/'):])
-            content = self.content.read(path)
-            if content:
-                content_type = 'application/octet-stream'
-                status_code = 200
-        else:
-            base_dir = os.path.dirname(os.path.realpath(__file__))
-            filename = os.path.normpath(os.path.realpath(base_dir + path))
-            extension = os.path.splitext(filename)[1]
-            if os.path.commonprefix([base_dir, filename]) == base_dir and \
-                os.path.exists(filename) and not os.path.isdir(filename) and \
-                extension in self.mime_types:
-                content_type = self.mime_types[extension]
-                with open(filename, 'rb') as file:
-                    content = file.read()
-                if path == '/index.html':
-                    content = content.decode('utf-8')
-                    meta = [
-                        '<meta name="type" content="Python">',
-                        '<meta name="version" content="' + __version__ + '">'
-                    ]
-                    if self.content.base:
-                        meta.append('<meta name="file" content="/data/' + self.content.base + '">')
-                        content = re.sub(r'<title>.*</title>', \
-                            '<title>' + self.content.title + '</title>', content)
-                    meta = '\n'.join(meta)
-                    content = re.sub(r'<meta name="version" content=".*">', meta, content)
-                    content = content.encode('utf-8')
-                status_code = 200
-        _log(self.verbosity > 1, str(status_code) + ' ' + self.command + ' ' + self.path + '\n')
-        self._write(status_code, content_type, content)
-    def log_message(self, format, *args): # pylint: disable=redefined-builtin
-        return
-    def _write(self, status_code, content_type, content):
-        self.send_response(status_code)
-        if content:
-            self.send_header('Content-Type', content_type)
-            self.send_header('Content-Length', len(content))
+        response = self.server.router.route(self.command, self.path, self.headers)
+        self.send_response(response.status_code)
+        for name, value in response.headers:
+            self.send_header(name, value)
+        if response.close:
+            self.send_header('Connection', 'close')
         self.end_headers()
         if self.command != 'HEAD':
-            if status_code == 404 and content is None:
-                self.wfile.write(str(status_code).encode('utf-8'))
-            elif (status_code in (200, 404)) and content is not None:
-                self.wfile.write(content)
+            if response.events:
+                # Event streams stay open as long as the page, keep them off the worker pool.
+                self.server.detach(self.connection, response)
+            else:
+                response.write(self.connection)
+    def log_message(self, format, *args): # pylint: disable=redefined-builtin
+        return
+    def setup(self):
+        http.server.BaseHTTPRequestHandler.setup(self)
+        self.requests = 0
+    def end_headers(self):
+        self.requests += 1
+        if self.close_connection:
+            pass
+        elif self.requests >= self.max_requests or self.server.busy():
+            self.send_header('Connection', 'close')
+        else:
+            self.send_header('Keep-Alive', 'timeout=' + str(self.timeout) + \
+                ', max=' + str(self.max_requests - self.requests))
+        http.server.BaseHTTPRequestHandler.end_headers(self)
+
+class _ThreadPoolHTTPServer(http.server.HTTPServer): # pylint: disable=too-many-instance-attributes
+    def __init__(self, address, router, threads, backlog):
+        self.request_queue_size = backlog
+        http.server.HTTPServer.__init__(self, address, _HTTPRequestHandler)
+        self.router = router
+        self.threads = threads
+        self.workers = []
+        self.pending = 0
+        self.lock = threading.Lock()
+        self.requests = queue.Queue(backlog)
+        self.wakeup = socket.socketpair()
+        self.stopped = False
+        self.detached = set()
+
+    def busy(self):
+        ''' Connections are waiting for a worker, persistent connections should be closed '''
+        return not self.requests.empty()
+
+    def serve_forever(self, poll_interval=None):
+        ''' Accept connections until shutdown() wakes up the selector '''
+        with selectors.DefaultSelector() as selector:
+            selector.register(self, selectors.EVENT_READ)
+            selector.register(self.wakeup[0], selectors.EVENT_READ)
+            while not self.stopped:
+                for key, _ in selector.select(poll_interval):
+                    if key.fileobj is self and not self.stopped:
+                        self._handle_request_noblock()
+
+    def shutdown(self):
+        ''' Stop the accept loop and worker threads '''
+        self.stopped = True
+        self.wakeup[1].send(b'\0')
+        for _ in self.workers:
+            try:
+                self.requests.put_nowait(None)
+            except queue.Full:
+                break
+
+    def server_close(self):
+        http.server.HTTPServer.server_close(self)
+        self.wakeup[0].close()
+        self.wakeup[1].close()
+
+    def detach(self, request, response):
+        ''' Write response body on a dedicated thread, the worker returns without closing '''
+        with self.lock:
+            self.detached.add(request)
+        thread = threading.Thread(target=self._stream, args=(request, response), daemon=True)
+        thread.start()
+
+    def shutdown_request(self, request):
+        with self.lock:
+            detached = request in self.detached
+        if not detached:
+            http.server.HTTPServer.shutdown_request(self, request)
+
+    def _stream(self, request, response):
+        try:
+            response.write(request)
+        finally:
+            with self.lock:
+                self.detached.discard(request)
+            http.server.HTTPServer.shutdown_request(self, request)
+
+    def process_request(self, request, client_address):
+        with self.lock:
+            self.pending += 1
+            if self.pending > len(self.workers) and len(self.workers) < self.threads:
+                worker = threading.Thread(target=self._worker, daemon=True)
+                self.workers.append(worker)
+                worker.start()
+        while not self.stopped:
+            try:
+                self.requests.put((request, client_address), timeout=0.1)
+                return
+            except queue.Full:
+                pass
+        self.shutdown_request(request)
+
+    def _worker(self):
+        while True:
+            item = self.requests.get()
+            if item is None:
+                return
+            request, client_address = item
+            try:
+                # Connections still queued at shutdown are closed without a response.
+                if not self.stopped:
+                    self.finish_request(request, client_address)
+            except Exception: # pylint: disable=broad-exception-caught
+                self.handle_error(request, client_address)
+            finally:
+                self.shutdown_request(request)
+                with self.lock:
+                    self.pending -= 1
+            if self.stopped and self.requests.empty():
+                return
+
+class _AsyncHTTPServer:
+    protocol_version = 'HTTP/1.1'
+    timeout = 5
+    max_requests = 100
+    def __init__(self, address, router, backlog):
+        self.router = router
+        self.loop = asyncio.new_event_loop()
+        self.socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.socket.bind(address)
+        self.socket.listen(backlog)
+        self.socket.setblocking(False)
+        self.backlog = backlog
+        self.stop_event = None
+        self.stopped = False
+        self.connections = {}
+
+    def serve_forever(self):
+        ''' Run event loop until shutdown() is called '''
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_until_complete(self._serve())
+
+    def shutdown(self):
+        ''' Stop event loop from another thread '''
+        self.stopped = True
+        if not self.loop.is_closed():
+            self.loop.call_soon_threadsafe(self._stop)
+
+    def server_close(self):
+        ''' Release event loop and socket '''
+        self.loop.close()
+        self.socket.close()
+
+    def _stop(self):
+        if self.stop_event:
+            self.stop_event.set()
+
+    async def _serve(self):
+        self.stop_event = asyncio.Event()
+        server = await asyncio.start_server(self._connection,
+            sock=self.socket, backlog=self.backlog)
+        async with server:
+            if not self.stopped:
+                await self.stop_event.wait()
+        # Tasks belong to start_server, closing the transports ends pending reads instead.
+        for writer in list(self.connections.values()):
+            writer.close()
+        await asyncio.gather(*self.connections, return_exceptions=True)
+
+    async def _connection(self, reader, writer):
+        task = asyncio.current_task()
+        self.connections[task] = writer
+        try:
+            requests = 0
+            keep_alive = True
+            while keep_alive and requests < self.max_requests:
+                try:
+                    head = await asyncio.wait_for(reader.readuntil(b'\r\n\r\n'), self.timeout)
+                except (asyncio.TimeoutError, asyncio.IncompleteReadError,
+                    asyncio.LimitOverrunError):
+                    break
+                requests += 1
+                request_line, _, head = head.partition(b'\r\n')
+                request_line = request_line.decode('iso-8859-1').split()
+                if len(request_line) != 3:
+                    break
+                method, target, version = request_line
+                headers = http.client.parse_headers(io.BytesIO(head))
+                length = int(headers.get('Content-Length', '0'))
+                if length > 0:
+                    await reader.readexactly(length)
+                connection = headers.get('Connection', '').lower()
+                keep_alive = connection == 'keep-alive' if version == 'HTTP/1.0' else \
+                    connection != 'close'
+                keep_alive = keep_alive and requests < self.max_requests
+                if method in ('GET', 'HEAD'):
+                    # Model conversion and graph windows run off the event loop.
+                    response = await asyncio.get_running_loop().run_in_executor(None,
+                        self.router.route, method, target, headers)
+                else:
+                    response = _Response(501, [ ('Content-Length', 0) ])
+                keep_alive = keep_alive and not response.close
+                writer.write(self._head(response, requests if keep_alive else None))
+                if method != 'HEAD':
+                    await response.write_async(writer)
+                await writer.drain()
+        except (ConnectionError, ValueError):
+            pass
+        finally:
+            self.connections.pop(task, None)
+            writer.close()
 
-class _ThreadedHTTPServer(socketserver.ThreadingMixIn, http.server.HTTPServer):
-    pass
+    def _head(self, response, requests):
+        lines = [ self.protocol_version + ' ' + str(response.status_code) + ' ' + \
+            http.HTTPStatus(response.status_code).phrase ]
+        lines.extend(name + ': ' + str(value) for name, value in response.headers)
+        lines.append('Date: ' + email.utils.formatdate(usegmt=True))
+        if requests is not None:
+            lines.append('Keep-Alive: timeout=' + str(self.timeout) + \
+                ', max=' + str(self.max_requests - requests))
+        else:
+            lines.append('Connection: close')
+        return ('\r\n'.join(lines) + '\r\n\r\n').encode('iso-8859-1')
 
-class _HTTPServerThread(threading.Thread):
-    def __init__(self, content, address, verbosity):
+class _Updater: # pylint: disable=too-few-public-methods
+    def __init__(self, router, verbosity):
+        self.router = router
+        self.verbosity = verbosity
+        self.condition = threading.Condition()
+        self.pending = collections.OrderedDict()
+        self.thread = None
+
+    def update(self, name, file, data):
+        ''' Queue model conversion, a newer update for the same name replaces a pending one '''
+        with self.condition:
+            self.pending[name] = (file, data)
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._run, daemon=True)
+                self.thread.start()
+
+    def _run(self):
+        while True:
+            with self.condition:
+                if len(self.pending) == 0:
+                    self.thread = None
+                    return
+                name, (file, data) = self.pending.popitem(last=False)
+            try:
+                content = _content(file, data, self.verbosity)
+            except Exception as error: # pylint: disable=broad-exception-caught
+                _log(self.verbosity > 0, 'Update failed: ' + str(error) + '\n')
+                continue
+            self.router.replace(name, file, data, content)
+
+class _HTTPServerThread(threading.Thread): # pylint: disable=too-many-instance-attributes
+    def __init__(self, content, address, verbosity, engine='threading', threads=16, backlog=64, # pylint: disable=too-many-arguments,too-many-positional-arguments,line-too-long
+        budget=1024 * 1024 * 1024):
         threading.Thread.__init__(self)
         self.verbosity = verbosity
         self.address = address
         self.url = 'http://' + address[0] + ':' + str(address[1])
-        self.server = _ThreadedHTTPServer(address, _HTTPRequestHandler)
-        self.server.timeout = 0.25
-        self.server.RequestHandlerClass.content = content
-        self.server.RequestHandlerClass.verbosity = verbosity
+        self.models = _ModelRegistry(budget, verbosity)
+        self.router = _Router(content, self.models, verbosity)
+        self.updater = _Updater(self.router, verbosity)
+        if engine == 'asyncio':
+            self.server = _AsyncHTTPServer(address, self.router, backlog)
+        elif engine == 'threading':
+            self.server = _ThreadPoolHTTPServer(address, self.router, threads, backlog)
+        else:
+            raise ValueError("Unsupported engine '" + str(engine) + "'.")
         self.terminate_event = threading.Event()
         self.terminate_event.set()
-        self.stop_event = threading.Event()
 
     def run(self):
-        self.stop_event.clear()
         self.terminate_event.clear()
+        if self.router.content:
+            self.router.infer(None, self.router.content)
         try:
-            while not self.stop_event.is_set():
-                self.server.handle_request()
+            self.server.serve_forever()
         except: # pylint: disable=bare-except
             pass
+        self.server.server_close()
         self.terminate_event.set()
-        self.stop_event.clear()
 
     def stop(self):
         ''' Stop server '''
         if self.alive():
             _log(self.verbosity > 0, "Stopping " + self.url + "\n")
-            self.stop_event.set()
-            self.server.server_close()
+            self.router.events.close()
+            self.server.shutdown()
             self.terminate_event.wait(1000)
 
     def alive(self):
@@ -159,15 +1074,15 @@ class _HTTPServerThread(threading.Thread):
 
 def _open(data):
     registry = dict([
-        ('onnx.onnx_ml_pb2.ModelProto', '.onnx'),
+        ('onnx.onnx_ml_pb2.ModelProto', '.onnx_'),
         ('torch.jit._script.ScriptModule', '.pytorch'),
         ('torch.Graph', '.pytorch'),
         ('torch._C.Graph', '.pytorch'),
         ('torch.nn.modules.module.Module', '.pytorch')
     ])
-    queue = [ data.__class__ ]
-    while len(queue) > 0:
-        current = queue.pop(0)
+    classes = [ data.__class__ ]
+    while len(classes) > 0:
+        current = classes.pop(0)
         if current.__module__ and current.__name__:
             name = current.__module__ + '.' + current.__name__
             if name in registry:
@@ -175,9 +1090,108 @@ def _open(data):
                 module = importlib.import_module(module_name, package=__package__)
                 model_factory = module.ModelFactory()
                 return model_factory.open(data)
-        queue.extend(_ for _ in current.__bases__ if isinstance(_, type))
+        classes.extend(_ for _ in current.__bases__ if isinstance(_, type))
     return None
 
+def _spill(chunks, spill_size=16 * 1024 * 1024):
+    ''' Join chunks into bytes, or into an mmap-backed temp file once larger than spill_size '''
+    buffer = bytearray()
+    file = None
+    for chunk in chunks:
+        if file is None and len(buffer) + len(chunk) > spill_size:
+            file = tempfile.TemporaryFile()
+            file.write(buffer)
+            buffer = None
+        if file:
+            file.write(chunk)
+        else:
+            buffer += chunk
+    if file is None:
+        return bytes(buffer)
+    with file:
+        file.flush()
+        return mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+def _content(file, data, verbosity):
+    content = _ContentProvider(data if isinstance(data, (bytes, bytearray)) else None, file, file)
+    if data and not isinstance(data, bytearray) and isinstance(data.__class__, type):
+        _log(verbosity > 1, 'Experimental\n')
+        model = _open(data)
+        if model:
+            content = _convert(file, model)
+    return content
+
+def _integer(query, key, default):
+    ''' Parse non-negative integer query parameter, raises ValueError if malformed '''
+    if key not in query:
+        return default
+    value = query[key][0]
+    if not value.isdigit() or not value.isascii():
+        raise ValueError("Invalid '" + key + "' value '" + value + "'.")
+    return int(value)
+
+def _convert(file, model):
+    ''' Convert model to JSON content, reusing gzip output cached by model hash '''
+    key = None
+    if hasattr(model, 'digest'):
+        try:
+            digest = model.digest() + '-' + __version__
+            key = hashlib.blake2b(digest.encode('utf-8'), digest_size=16).hexdigest()
+        except Exception: # pylint: disable=broad-exception-caught
+            # Models which cannot be hashed are converted without caching.
+            key = None
+    data, gzip = _cached(key, model.to_json_stream)
+    content = _ContentProvider(data, 'model.netron', file, True, model)
+    content.key = key
+    _cache_gzip(key, content.content, gzip)
+    return content
+
+def _cached(key, generate):
+    ''' Return data and gzip buffer from conversion cache, or generate text chunks on a miss '''
+    gzip = _cache.get(key) if key else None
+    if gzip is not None:
+        try:
+            return _spill(_gunzip(gzip)), gzip
+        except zlib.error:
+            pass
+    return _spill(_batch(_.encode('utf-8') for _ in generate())), None
+
+def _cache_gzip(key, content, gzip):
+    if gzip is not None:
+        content.gzip = _Content(len(gzip), content.mtime, buffer=gzip,
+            etag=content.etag[:-1] + '-gzip"')
+    elif key:
+        _cache.put(key, content.compress().buffer)
+
+def _batch(chunks, size=64 * 1024):
+    buffer = bytearray()
+    for chunk in chunks:
+        buffer += chunk
+        if len(buffer) >= size:
+            yield buffer
+            buffer = bytearray()
+    if len(buffer) > 0:
+        yield buffer
+
+def _gzip(chunks):
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        yield compressor.compress(chunk)
+    yield compressor.flush()
+
+def _gunzip(buffer):
+    decompressor = zlib.decompressobj(31)
+    size = 1024 * 1024
+    with memoryview(buffer) as view:
+        for offset in range(0, len(view), size):
+            yield decompressor.decompress(view[offset:offset + size])
+    yield decompressor.flush()
+    if not decompressor.eof:
+        raise zlib.error('Truncated gzip stream.')
+
+def _etag(data):
+    return '"' + hashlib.sha256(data).hexdigest()[0:32] + '"'
+
 def _threads(address=None):
     threads = [ _ for _ in threading.enumerate() if isinstance(_, _HTTPServerThread) and _.alive() ]
     if address is not None:
@@ -187,6 +1201,12 @@ def _threads(address=None):
             threads = [ _ for _ in threads if address[1] == _.address[1] ]
     return threads
 
+def _thread(address):
+    threads = _threads(address)
+    if len(threads) == 0:
+        raise ValueError('No server running at address.')
+    return threads[0]
+
 def _log(condition, message):
     if condition:
         sys.stdout.write(message)
@@ -232,6 +1252,91 @@ def _make_port(address):
         return address
     raise ValueError('Failed to allocate port.')
 
+def _export_files(paths, extensions=('.onnx', '.pt', '.pth', '.torchscript')):
+    ''' Expand directories to (file, output name) pairs of model files '''
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _, names in os.walk(path):
+                for name in sorted(names):
+                    if os.path.splitext(name)[1].lower() in extensions:
+                        file = os.path.join(root, name)
+                        files.append((file, os.path.relpath(file, path)))
+        else:
+            files.append((path, os.path.basename(path)))
+    return files
+
+def _export_initialize(memory):
+    if memory:
+        import resource # pylint: disable=import-outside-toplevel
+        resource.setrlimit(resource.RLIMIT_AS, (memory, memory))
+
+def _export_timeout(signum, frame): # pylint: disable=unused-argument
+    raise TimeoutError('Timeout expired.')
+
+def _export_file(file, output, timeout):
+    ''' Convert model file in a worker process, errors are returned as part of the result '''
+    result = { 'file': file, 'size': 0, 'output': 0, 'time': 0 }
+    started = time.time()
+    alarm = timeout and hasattr(signal, 'SIGALRM')
+    if alarm:
+        signal.signal(signal.SIGALRM, _export_timeout)
+        signal.alarm(max(1, int(timeout)))
+    try:
+        result['size'] = os.path.getsize(file)
+        if file.lower().endswith('.onnx'):
+            data = importlib.import_module('.onnx_', package=__package__).load(file)
+        else:
+            data = importlib.import_module('torch').jit.load(file, map_location='cpu')
+        model = _open(data)
+        if model is None:
+            raise ValueError('Unsupported model format.')
+        content = _convert(file, model)
+        result['output'] = len(content.data)
+        if output:
+            os.makedirs(os.path.dirname(output), exist_ok=True)
+            with open(output, 'wb') as handle:
+                handle.write(content.data)
+    except Exception as error: # pylint: disable=broad-exception-caught
+        result['error'] = type(error).__name__ + (': ' + str(error) if str(error) else '')
+    finally:
+        if alarm:
+            signal.alarm(0)
+    result['time'] = time.time() - started
+    return result
+
+def _export_pool(files, output, jobs, timeout, memory): # pylint: disable=too-many-arguments,too-many-positional-arguments
+    ''' Yield ((file, name), result) pairs as conversions complete, None if the pool broke '''
+    with concurrent.futures.ProcessPoolExecutor(jobs, initializer=_export_initialize,
+        initargs=(memory,)) as executor:
+        futures = {}
+        for file, name in files:
+            target = os.path.join(output, name + '.netron') if output else None
+            futures[executor.submit(_export_file, file, target, timeout)] = (file, name)
+        for future in concurrent.futures.as_completed(futures):
+            try:
+                yield futures[future], future.result()
+            except concurrent.futures.BrokenExecutor:
+                yield futures[future], None
+
+def _export_summary(results, duration):
+    lines = []
+    for result in sorted(results, key=lambda _: -_['time']):
+        rate = result['size'] / (1024 * 1024) / result['time'] if result['time'] > 0 else 0
+        state = result.get('error', format(result['output'] / (1024 * 1024), '.1f') + ' MB')
+        lines.append(format(result['time'], '8.2f') + 's ' + format(rate, '8.1f') + ' MB/s  ' + \
+            result['file'] + '  ' + state)
+    failed = len([ _ for _ in results if 'error' in _ ])
+    size = sum(_['size'] for _ in results) / (1024 * 1024)
+    lines.append(str(len(results) - failed) + ' converted, ' + str(failed) + ' failed, ' + \
+        format(size, '.1f') + ' MB in ' + format(duration, '.2f') + 's (' + \
+        format(len(results) / duration if duration > 0 else 0, '.2f') + ' models/s)')
+    return '\n'.join(lines) + '\n'
+
+_assets = _AssetCache(os.path.dirname(os.path.realpath(__file__)))
+_cache = _ConversionCache(os.path.join(os.environ.get('XDG_CACHE_HOME') or \
+    os.path.join(os.path.expanduser('~'), '.cache'), 'netron'), 1024 * 1024 * 1024)
+
 def stop(address=None):
     '''Stop serving model at address.
 
@@ -260,15 +1365,87 @@ def wait():
         _log(True, '\n')
         stop()
 
-def serve(file, data, address=None, browse=False, verbosity=1):
-    '''Start serving model from file or data buffer at address and open in web browser.
+def add_model(name, file, data=None, address=None):
+    '''Add model to the server at address, served at /models/<name>/.
+    The model is loaded on first access.
+
+    Args:
+        name (string): Model name used in the URL.
+        file (string): Model file to serve. Required to detect format.
+        data (bytes, optional): Model data to serve. None will load data from file.
+        address (tuple, optional): A (host, port) tuple, or a port number.
+
+    Returns:
+        The model URL.
+    '''
+    if not data and file and not os.path.exists(file):
+        raise FileNotFoundError(errno.ENOENT, os.strerror(errno.ENOENT), file)
+    thread = _thread(address)
+    thread.models.add(name, file, data)
+    return thread.url + '/models/' + urllib.parse.quote(name, safe='') + '/'
+
+def remove_model(name, address=None):
+    '''Remove model from the server at address.
+
+    Args:
+        name (string): Model name.
+        address (tuple, optional): A (host, port) tuple, or a port number.
+
+    Returns:
+        False if no model with this name was added.
+    '''
+    return _thread(address).models.remove(name)
+
+def list_models(address=None):
+    '''List models added to the server at address.
+
+    Args:
+        address (tuple, optional): A (host, port) tuple, or a port number.
+
+    Returns:
+        A list of dicts with 'name', 'file' and 'loaded' keys.
+    '''
+    return _thread(address).models.list()
+
+def update(file, data, address=None, name=None):
+    '''Replace the model served at address without restarting the server.
+    Conversion runs on a background thread, connected pages reload the graph when done.
+    The data object should not be modified until the update is served.
 
     Args:
         file (string): Model file to serve. Required to detect format.
         data (bytes): Model data to serve. None will load data from file.
         address (tuple, optional): A (host, port) tuple, or a port number.
+        name (string, optional): Model added with add_model() to replace. Default: None
+
+    Raises:
+        ValueError: No model with this name was added.
+    '''
+    if not data and file and not os.path.exists(file):
+        raise FileNotFoundError(errno.ENOENT, os.strerror(errno.ENOENT), file)
+    thread = _thread(address)
+    if name is not None and not thread.models.contains(name):
+        raise ValueError("Model '" + str(name) + "' is not registered.")
+    thread.updater.update(name, file, data)
+
+def serve(file, data, address=None, browse=False, verbosity=1, # pylint: disable=too-many-arguments,too-many-positional-arguments
+    engine='threading', threads=16, backlog=64, budget=1024 * 1024 * 1024):
+    '''Start serving model from file or data buffer at address and open in web browser.
+
+    Args:
+        file (string): Model file to serve. Required to detect format.
+        data (bytes): Model data to serve. None will load data from file. ONNX models
+            loaded with onnx_.load() resolve weights lazily relative to the file directory.
+            ONNX value shapes are inferred in the background and sent to connected pages.
+        address (tuple, optional): A (host, port) tuple, or a port number.
         browse (bool, optional): Launch web browser. Default: True
         log (bool, optional): Log details to console. Default: False
+        engine (string, optional): 'threading' or 'asyncio' for a single threaded event loop.
+            Default: 'threading'
+        threads (int, optional): Maximum number of request worker threads. Default: 16
+        backlog (int, optional): Maximum number of connections waiting for a worker. Default: 64
+        budget (int, optional): Memory budget in bytes for models added with add_model().
+            Least recently used models are unloaded beyond the budget. Default: 1 GB
 
     Returns:
         A (host, port) address tuple.
@@ -278,14 +1455,7 @@ def serve(file, data, address=None, browse=False, verbosity=1):
     if not data and file and not os.path.exists(file):
         raise FileNotFoundError(errno.ENOENT, os.strerror(errno.ENOENT), file)
 
-    content = _ContentProvider(data, file, file)
-
-    if data and not isinstance(data, bytearray) and isinstance(data.__class__, type):
-        _log(verbosity > 1, 'Experimental\n')
-        model = _open(data)
-        if model:
-            text = json.dumps(model.to_json(), indent=4, ensure_ascii=False)
-            content = _ContentProvider(text.encode('utf-8'), 'model.netron', file)
+    content = _content(file, data, verbosity)
 
     address = _make_address(address)
     if isinstance(address[1], int) and address[1] != 0:
@@ -293,7 +1463,7 @@ def serve(file, data, address=None, browse=False, verbosity=1):
     else:
         address = _make_port(address)
 
-    thread = _HTTPServerThread(content, address, verbosity)
+    thread = _HTTPServerThread(content, address, verbosity, engine, threads, backlog, budget)
     thread.start()
     while not thread.alive():
         time.sleep(0.01)
@@ -304,7 +1474,7 @@ def serve(file, data, address=None, browse=False, verbosity=1):
 
     return address
 
-def start(file=None, address=None, browse=True, verbosity=1):
+def start(file=None, address=None, browse=True, verbosity=1, engine='threading'):
     '''Start serving model file at address and open in web browser.
 
     Args:
@@ -312,8 +1482,48 @@ def start(file=None, address=None, browse=True, verbosity=1):
         log (bool, optional): Log details to console. Default: False
         browse (bool, optional): Launch web browser, Default: True
         address (tuple, optional): A (host, port) tuple, or a port number.
+        engine (string, optional): 'threading' or 'asyncio'. Default: 'threading'
 
     Returns:
         A (host, port) address tuple.
     '''
-    return serve(file, None, browse=browse, address=address, verbosity=verbosity)
+    return serve(file, None, browse=browse, address=address, verbosity=verbosity, engine=engine)
+
+def export(paths, output=None, jobs=None, timeout=600, memory=None, verbosity=1): # pylint: disable=too-many-arguments,too-many-positional-arguments
+    '''Convert ONNX and TorchScript models to viewer JSON in parallel worker processes.
+    ONNX conversions are also stored in the conversion cache used by serve(), TorchScript
+    models have no content hash and are converted again when served.
+
+    Args:
+        paths (list): Model files or directories searched for model files.
+        output (string, optional): Directory to write a .netron JSON file per model to.
+        jobs (int, optional): Number of worker processes. Default: CPU count
+        timeout (float, optional): Seconds per model before conversion is aborted. Default: 600
+        memory (int, optional): Address space limit in bytes per worker process.
+        verbosity (int, optional): 0 quiet, 1 progress and summary. Default: 1
+
+    Returns:
+        A list of dicts with 'file', 'size', 'output', 'time' and on failure 'error' keys.
+    '''
+    verbosity = { '0': 0, 'quiet': 0, '1': 1, 'default': 1, '2': 2, 'debug': 2 }[str(verbosity)]
+    files = _export_files(paths)
+    results = []
+    def report(result):
+        results.append(result)
+        state = result.get('error', format(result['time'], '.2f') + 's')
+        _log(verbosity > 0, '[' + str(len(results)) + '/' + str(len(files)) + '] ' + \
+            result['file'] + ' ' + state + '\n')
+    started = time.time()
+    retries = []
+    for item, result in _export_pool(files, output, jobs, timeout, memory):
+        if result is None:
+            retries.append(item)
+        else:
+            report(result)
+    for item in retries:
+        # A crashed worker fails every conversion of its pool, affected files run in isolation.
+        for _, result in _export_pool([ item ], output, 1, timeout, memory):
+            report(result or { 'file': item[0], 'size': 0, 'output': 0, 'time': 0,
+                'error': 'Worker process terminated.' })
+    _log(verbosity > 0, _export_summary(results, time.time() - started))
+    return results
@@ -66,6 +66,14 @@ view.View = class {
                 const element = this._element('menu');
                 this._menu = new view.Menu(this._host, element, button);
             }
+            client.on_revert = (error) => {
+                this._host.error('Edit failed.', error.message + ' The model was reloaded from the server.');
+                client.reload(this._host).then((fileContext) => {
+                    if (fileContext) {
+                        this.open(fileContext);
+                    }
+                });
+            };
             if (this._host.environment('menu')) {
                 const file = this._menu.group('&File');
                 file.add({
@@ -112,6 +120,31 @@ view.View = class {
                     enabled: () => this.activeGraph && client.connected
                 });
                 const edit = this._menu.group('&Edit');
+                edit.add({
+                    label: '&Undo',
+                    execute: () => {
+                        client.undo(this._host)
+                            .then((fileContext) => {
+                                if (fileContext) {
+                                    this.open(fileContext);
+                                }
+                            });
+                    },
+                    enabled: () => this.activeGraph && client.connected
+                });
+                edit.add({
+                    label: '&Redo',
+                    execute: () => {
+                        client.redo(this._host)
+                            .then((fileContext) => {
+                                if (fileContext) {
+                                    this.open(fileContext);
+                                }
+                            });
+                    },
+                    enabled: () => this.activeGraph && client.connected
+                });
+                edit.add({});
                 edit.add({
                     label: '&Add Node',
                     accelerator: 'CmdOrCtrl+N',
@@ -370,6 +403,10 @@ view.View = class {
         }
     }
 
+    refresh() {
+        this._reload();
+    }
+
     _reload() {
         this.show('welcome spinner');
         if (this._model && this._graphs.length > 0) {
@@ -1622,6 +1659,7 @@ view.Graph = class extends grapher.Graph {
     }
 
     add(graph) {
+        this.layout = graph.layout || null;
         all_tensors = graph.inputs;
         for (const node of graph.nodes) {
             all_tensors = all_tensors.concat(node.outputs);
@@ -2226,6 +2264,17 @@ view.NodeSidebar = class extends view.Control {
             node.description = newValue;
             client.change_node_description(node.unique_id, newValue);
         }));
+        const activeGraph = main_view.activeGraph;
+        if (activeGraph && activeGraph.expandable && activeGraph.expandable(node)) {
+            // Collapsed repeats of a block load their nodes from the server on demand.
+            this._addCenteredButton('Expand Block', this._properties_div, () => {
+                activeGraph.expand(node).then(() => {
+                    main_view._reload();
+                }).catch((error) => {
+                    this.emit('error', error);
+                });
+            });
+        }
         this._addCenteredButton('Delete Node', this._properties_div, () => {
             // Confirm with user.
             if (!this._host.confirm("Delete this " + node.type.name + " node?", '')) {
@@ -3241,9 +3290,25 @@ view.ArgumentView = class extends view.ValueView {
                 }
 
                 if (initializer) {
-                    this._tensor(initializer);
+                    const request = typeof initializer.fetch === 'function' ? initializer.fetch() : null;
+                    if (request) {
+                        const token = {};
+                        this._request = token;
+                        request.then(() => {
+                            if (this._request === token) {
+                                this._tensor(initializer);
+                            }
+                        }).catch((error) => {
+                            if (this._request === token) {
+                                this._code('error', error && error.message ? error.message : 'Tensor data could not be loaded.');
+                            }
+                        });
+                    } else {
+                        this._tensor(initializer);
+                    }
                 }
             } else {
+                delete this._request;
                 this._expander.innerText = '+';
                 while (this._element.childElementCount > 4) {
                     this._element.removeChild(this._element.lastChild);
@@ -4,6 +4,7 @@
 
 import os
 import sys
+import tempfile
 
 root_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 sys.path.append(root_dir)
@@ -32,6 +33,329 @@ def _test_onnx_iterate():
             address = netron.serve(file, model, verbosity='quiet')
             netron.stop(address)
 
+def _test_keep_alive():
+    http_client = __import__('http.client').client
+    address = netron.serve(None, None, address=('localhost', 0), verbosity='quiet')
+    connection = http_client.HTTPConnection(address[0], address[1])
+    ports = set()
+    for path in [ '/', '/index.js', '/view.js', '/onnx-metadata.json', '/missing.js' ] * 10:
+        connection.request('GET', path, headers={ 'Accept-Encoding': 'gzip' })
+        response = connection.getresponse()
+        response.read()
+        ports.add(connection.sock.getsockname()[1])
+        assert response.version == 11 and not response.will_close
+    connection.close()
+    netron.stop(address)
+    assert len(ports) == 1
+
+def _test_events():
+    http_client = __import__('http.client').client
+    threads = 4
+    address = netron.serve(None, None, address=('localhost', 0), verbosity='quiet',
+        threads=threads)
+    streams = []
+    for _ in range(threads):
+        connection = http_client.HTTPConnection(address[0], address[1])
+        connection.request('GET', '/events')
+        response = connection.getresponse()
+        assert response.status == 200
+        streams.append(connection)
+    connection = http_client.HTTPConnection(address[0], address[1], timeout=5)
+    connection.request('GET', '/')
+    response = connection.getresponse()
+    response.read()
+    assert response.status == 200
+    connection.close()
+    netron.stop(address)
+    for stream in streams:
+        stream.close()
+
+def _test_models():
+    http_client = __import__('http.client').client
+    onnx = __import__('onnx')
+    node = onnx.helper.make_node('Relu', [ 'x' ], [ 'y' ])
+    value = onnx.helper.make_tensor_value_info('x', onnx.TensorProto.FLOAT, [ 1, 8 ])
+    output = onnx.helper.make_tensor_value_info('y', onnx.TensorProto.FLOAT, [ 1, 8 ])
+    graph = onnx.helper.make_graph([ node ], 'relu', [ value ], [ output ])
+    data = onnx.helper.make_model(graph).SerializeToString()
+    address = netron.serve(None, None, address=('localhost', 0), verbosity='quiet',
+        engine='asyncio')
+    netron.add_model('relu', 'relu.onnx', data, address)
+    connections = []
+    for _ in range(4):
+        connection = http_client.HTTPConnection(address[0], address[1], timeout=5)
+        connection.request('GET', '/models/relu/')
+        connections.append(connection)
+    for connection in connections:
+        response = connection.getresponse()
+        response.read()
+        assert response.status == 200
+        connection.close()
+    assert netron.list_models(address)[0]['loaded']
+    connection = http_client.HTTPConnection(address[0], address[1], timeout=5)
+    connection.request('GET', '/models/relu?v=1')
+    response = connection.getresponse()
+    response.read()
+    assert response.status == 301 and response.getheader('Location') == '/models/relu/?v=1'
+    # Initializer data which does not match its type fails to convert.
+    model = onnx.load_from_string(data)
+    model.graph.initializer.add(name='w', data_type=onnx.TensorProto.FLOAT, dims=[ 4 ],
+        raw_data=b'\x00\x00')
+    netron.add_model('broken', 'broken.onnx', model, address)
+    for _ in range(2):
+        connection.request('GET', '/models/broken/')
+        response = connection.getresponse()
+        response.read()
+        assert response.status == 500
+    connection.close()
+    try:
+        netron.update('relu.onnx', data, address, name='missing')
+        raise AssertionError('Expected ValueError')
+    except ValueError:
+        pass
+    netron.stop(address)
+
+def _test_export_cache():
+    numpy = __import__('numpy')
+    onnx = __import__('onnx')
+    server = sys.modules['source.server']
+    weight = onnx.numpy_helper.from_array(numpy.random.rand(64, 64).astype(numpy.float32), 'w')
+    node = onnx.helper.make_node('MatMul', [ 'x', 'w' ], [ 'y' ])
+    value = onnx.helper.make_tensor_value_info('x', onnx.TensorProto.FLOAT, [ 1, 64 ])
+    output = onnx.helper.make_tensor_value_info('y', onnx.TensorProto.FLOAT, [ 1, 64 ])
+    graph = onnx.helper.make_graph([ node ], 'matmul', [ value ], [ output ], [ weight ])
+    with tempfile.TemporaryDirectory() as folder:
+        file = os.path.join(folder, 'matmul.onnx')
+        onnx.save(onnx.helper.make_model(graph), file)
+        results = netron.export([ file ], jobs=1, verbosity='quiet')
+        assert 'error' not in results[0]
+        misses = []
+        put = server._cache.put # pylint: disable=protected-access
+        server._cache.put = lambda key, buffer: misses.append(key) # pylint: disable=protected-access
+        try:
+            address = netron.serve(None, onnx.load(file), address=('localhost', 0),
+                verbosity='quiet')
+            netron.stop(address)
+        finally:
+            server._cache.put = put # pylint: disable=protected-access
+        assert not misses
+
+def _tensors(graph):
+    yield from graph.initializer
+    for node in graph.node:
+        for attribute in node.attribute:
+            if attribute.HasField('t'):
+                yield attribute.t
+            yield from attribute.tensors
+            if attribute.HasField('g'):
+                yield from _tensors(attribute.g)
+            for subgraph in attribute.graphs:
+                yield from _tensors(subgraph)
+
+def _onnx_load(file, size_limit=1024):
+    onnx = __import__('onnx')
+    onnx_ = __import__('source.onnx_').onnx_
+    model = onnx_.load(file, size_limit=size_limit)
+    external = [ _.name for _ in model.graph.initializer \
+        if _.data_location == onnx.TensorProto.EXTERNAL ]
+    onnx.external_data_helper.load_external_data_for_model(model, os.path.dirname(file))
+    expected = onnx.load(file)
+    # Resolved external data is marked as default location, inline data has no location.
+    for tensor in list(_tensors(model.graph)) + list(_tensors(expected.graph)):
+        if tensor.HasField('data_location') and \
+            tensor.data_location == onnx.TensorProto.DEFAULT:
+            tensor.ClearField('data_location')
+    assert model == expected
+    return external
+
+def _test_onnx_load_subgraphs():
+    numpy = __import__('numpy')
+    onnx = __import__('onnx')
+    def weight(name):
+        return onnx.numpy_helper.from_array(numpy.random.rand(32, 32).astype(numpy.float32), name)
+    def branch(name):
+        node = onnx.helper.make_node('Add', [ 'x', name + '_w' ], [ name + '_y' ])
+        output = onnx.helper.make_tensor_value_info(name + '_y', onnx.TensorProto.FLOAT, None)
+        return onnx.helper.make_graph([ node ], name, [], [ output ], [ weight(name + '_w') ])
+    nodes = [
+        onnx.helper.make_node('If', [ 'c' ], [ 'y' ], then_branch=branch('then'),
+            else_branch=branch('else')),
+        onnx.helper.make_node('Loop', [ 'n', 'c' ], [ 'z' ], body=onnx.helper.make_graph(
+            [ onnx.helper.make_node('Identity', [ 'c' ], [ 'd' ]) ], 'body',
+            [ onnx.helper.make_tensor_value_info('i', onnx.TensorProto.INT64, []),
+              onnx.helper.make_tensor_value_info('c', onnx.TensorProto.BOOL, []) ],
+            [ onnx.helper.make_tensor_value_info('d', onnx.TensorProto.BOOL, []) ],
+            [ weight('body_w') ]))
+    ]
+    graph = onnx.helper.make_graph(nodes, 'subgraphs',
+        [ onnx.helper.make_tensor_value_info('c', onnx.TensorProto.BOOL, []) ],
+        [ onnx.helper.make_tensor_value_info('y', onnx.TensorProto.FLOAT, None) ],
+        [ weight('x'), onnx.numpy_helper.from_array(numpy.array(4, numpy.int64), 'n') ])
+    with tempfile.TemporaryDirectory() as folder:
+        file = os.path.join(folder, 'subgraphs.onnx')
+        onnx.save(onnx.helper.make_model(graph), file)
+        # Only initializers of the main graph are resolved lazily.
+        assert _onnx_load(file) == [ 'x' ]
+
+def _test_onnx_load_external():
+    numpy = __import__('numpy')
+    onnx = __import__('onnx')
+    weights = [ numpy.random.rand(*shape).astype(numpy.float32) for shape in [ (64, 64), (4,) ] ]
+    nodes = [ onnx.helper.make_node('Gemm', [ 'x', 'w', 'b' ], [ 'y' ]) ]
+    graph = onnx.helper.make_graph(nodes, 'gemm',
+        [ onnx.helper.make_tensor_value_info('x', onnx.TensorProto.FLOAT, [ 1, 64 ]) ],
+        [ onnx.helper.make_tensor_value_info('y', onnx.TensorProto.FLOAT, [ 1, 64 ]) ],
+        [ onnx.numpy_helper.from_array(weights[0], 'w'),
+          onnx.numpy_helper.from_array(weights[1], 'b') ])
+    with tempfile.TemporaryDirectory() as folder:
+        file = os.path.join(folder, 'gemm.onnx')
+        onnx.save(onnx.helper.make_model(graph), file, save_as_external_data=True,
+            location='gemm.bin', size_threshold=1024)
+        assert _onnx_load(file, size_limit=0) == [ 'w', 'b' ]
+        onnx_ = __import__('source.onnx_').onnx_
+        tensor = onnx_.load(file, size_limit=0).graph.initializer[0]
+        assert [ _.value for _ in tensor.external_data if _.key == 'location' ] == [ 'gemm.bin' ]
+
+def _test_onnx_load_size_limit():
+    numpy = __import__('numpy')
+    onnx = __import__('onnx')
+    initializers = [ onnx.numpy_helper.from_array(numpy.random.rand(256 + i).astype(
+        numpy.float32), 'w' + str(i)) for i in range(-1, 2) ]
+    nodes = [ onnx.helper.make_node('Identity', [ _.name ], [ _.name + '_y' ]) \
+        for _ in initializers ]
+    graph = onnx.helper.make_graph(nodes, 'limit', [], [
+        onnx.helper.make_tensor_value_info(_.name + '_y', onnx.TensorProto.FLOAT, None) \
+            for _ in initializers ], initializers)
+    with tempfile.TemporaryDirectory() as folder:
+        file = os.path.join(folder, 'limit.onnx')
+        onnx.save(onnx.helper.make_model(graph), file)
+        # 1020, 1024 and 1028 bytes of raw data.
+        assert _onnx_load(file, size_limit=1024) == [ 'w1' ]
+        assert _onnx_load(file, size_limit=1023) == [ 'w0', 'w1' ]
+
+def _test_onnx_load_truncated():
+    numpy = __import__('numpy')
+    onnx = __import__('onnx')
+    onnx_ = __import__('source.onnx_').onnx_
+    decode_error = __import__('google.protobuf.message').protobuf.message.DecodeError
+    weight = onnx.numpy_helper.from_array(numpy.random.rand(64).astype(numpy.float32), 'w')
+    nodes = [ onnx.helper.make_node('Add', [ 'x', 'w' ], [ 'y' ]) ]
+    graph = onnx.helper.make_graph(nodes, 'add',
+        [ onnx.helper.make_tensor_value_info('x', onnx.TensorProto.FLOAT, [ 64 ]) ],
+        [ onnx.helper.make_tensor_value_info('y', onnx.TensorProto.FLOAT, [ 64 ]) ], [ weight ])
+    data = onnx.helper.make_model(graph).SerializeToString()
+    corrupt = [ b'\xff' * 16, b'\x3a\xff\xff\xff\xff\x0f', b'\x3f', b'\x3a\x05\x2a\x80' ]
+    with tempfile.TemporaryDirectory() as folder:
+        file = os.path.join(folder, 'add.onnx')
+        for item in [ data[:_] for _ in range(1, len(data)) ] + corrupt:
+            with open(file, 'wb') as stream:
+                stream.write(item)
+            try:
+                valid = onnx.load(file) is not None
+            except decode_error:
+                valid = False
+            if valid:
+                # Messages cut between fields are valid protobuf.
+                _onnx_load(file, size_limit=64)
+                continue
+            try:
+                onnx_.load(file, size_limit=64)
+            except (ValueError, decode_error):
+                continue
+            raise AssertionError('Expected error for ' + str(len(item)) + ' bytes')
+
+def _test_window():
+    http_client = __import__('http.client').client
+    json = __import__('json')
+    onnx = __import__('onnx')
+    names = [ 'x', 'a', 'b', 'c', 'd', 'y' ]
+    nodes = [ onnx.helper.make_node('Relu', [ inputs ], [ outputs ], name='n' + str(i)) \
+        for i, (inputs, outputs) in enumerate(zip(names, names[1:])) ]
+    model = onnx.helper.make_model(onnx.helper.make_graph(nodes, 'chain', [], []))
+    address = netron.serve('chain.onnx', model, address=('localhost', 0), verbosity='quiet')
+    connection = http_client.HTTPConnection(address[0], address[1], timeout=5)
+    def get(path, status=200):
+        connection.request('GET', '/data/graph/' + path)
+        response = connection.getresponse()
+        data = response.read()
+        assert response.status == status, path
+        return json.loads(data) if status == 200 else data
+    window = get('nodes?start=1&count=2')
+    assert window['total'] == 5 and window['indices'] == [ 1, 2 ]
+    assert window['nodes']['name'] == [ 'n1', 'n2' ]
+    assert window['arguments']['name'] == [ 'a', 'b', 'c' ]
+    assert get('nodes?start=4&count=1000')['indices'] == [ 4 ]
+    assert get('nodes?start=9')['indices'] == []
+    assert get('neighborhood?node=2')['indices'] == [ 1, 2, 3 ]
+    assert get('neighborhood?node=0&hops=2')['indices'] == [ 0, 1, 2 ]
+    assert get('neighborhood?tensor=c&hops=2')['indices'] == [ 1, 2, 3, 4 ]
+    get('neighborhood?node=5', 404)
+    get('neighborhood?tensor=z', 404)
+    get('neighborhood', 404)
+    get('unknown', 404)
+    for query in [ 'nodes?start=x', 'nodes?count=-1', 'nodes?start=1.5', 'neighborhood?node=a',
+        'neighborhood?node=-1', 'neighborhood?node=1&hops=2x' ]:
+        get(query, 400)
+    connection.close()
+    netron.stop(address)
+
+def _test_shapes_timeout():
+    http_client = __import__('http.client').client
+    time = __import__('time')
+    onnx = __import__('onnx')
+    server = sys.modules['source.server']
+    node = onnx.helper.make_node('Relu', [ 'x' ], [ 'y' ])
+    value = onnx.helper.make_tensor_value_info('x', onnx.TensorProto.FLOAT, [ 1, 8 ])
+    graph = onnx.helper.make_graph([ node ], 'relu', [ value ], [])
+    timeout = server._ContentProvider.shapes_timeout # pylint: disable=protected-access
+    server._ContentProvider.shapes_timeout = 0.01 # pylint: disable=protected-access
+    try:
+        address = netron.serve('relu.onnx', onnx.helper.make_model(graph),
+            address=('localhost', 0), verbosity='quiet')
+        connection = http_client.HTTPConnection(address[0], address[1], timeout=5)
+        for _ in range(50):
+            connection.request('GET', '/data/graph/shapes')
+            response = connection.getresponse()
+            data = response.read()
+            if response.status != 404:
+                break
+            time.sleep(0.1)
+        assert response.status == 500 and data.startswith(b'Shape inference timed out')
+        connection.close()
+        netron.stop(address)
+    finally:
+        server._ContentProvider.shapes_timeout = timeout # pylint: disable=protected-access
+
+def _test_collapsed():
+    http_client = __import__('http.client').client
+    json = __import__('json')
+    onnx = __import__('onnx')
+    nodes = []
+    for i in range(1000):
+        names = [ 'x' + str(i), 'a' + str(i), 'b' + str(i), 'c' + str(i), 'x' + str(i + 1) ]
+        for op_type, inputs, outputs in zip([ 'Relu', 'Sigmoid', 'Neg', 'Abs' ], names, names[1:]):
+            nodes.append(onnx.helper.make_node(op_type, [ inputs ], [ outputs ]))
+    model = onnx.helper.make_model(onnx.helper.make_graph(nodes, 'blocks', [], []))
+    address = netron.serve('blocks.onnx', model, address=('localhost', 0), verbosity='quiet')
+    connection = http_client.HTTPConnection(address[0], address[1], timeout=5)
+    def get(path):
+        connection.request('GET', path)
+        response = connection.getresponse()
+        data = response.read()
+        assert response.status == 200
+        return data
+    assert b'<meta name="file" content="/data/model.netron?view=collapsed">' in get('/')
+    graph = json.loads(get('/data/model.netron?view=collapsed'))['graphs'][0]
+    # The first Relu reads a graph input and is not part of the repeated block.
+    assert graph['blocks'] == [ { 'start': 1, 'length': 4, 'count': 999 } ]
+    assert graph['indices'][:7] == [ 0, 1, 2, 3, 4, 5, 9 ]
+    assert graph['nodes']['types'][graph['nodes']['type'][5]]['name'] == 'Block'
+    window = json.loads(get('/data/graph/nodes?start=5&count=4'))
+    assert window['indices'] == [ 5, 6, 7, 8 ]
+    assert window['arguments']['name'][window['nodes']['inputs']['values'][0]] == 'a1'
+    connection.close()
+    netron.stop(address)
+
 def _test_torchscript_transformer():
     torch = __import__('torch')
     model = torch.nn.Transformer(nhead=16, num_encoder_layers=12)
@@ -88,6 +412,17 @@ def _test_torchscript_nnapi():
 
 # _test_onnx()
 # _test_onnx_iterate()
+# _test_keep_alive()
+# _test_events()
+# _test_models()
+# _test_export_cache()
+# _test_onnx_load_subgraphs()
+# _test_onnx_load_external()
+# _test_onnx_load_size_limit()
+# _test_onnx_load_truncated()
+# _test_window()
+# _test_collapsed()
+# _test_shapes_timeout()
 
 # _test_torchscript()
 # _test_torchscript_quantized()
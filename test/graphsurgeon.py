@@ -0,0 +1,104 @@
+#!/usr/bin/env python
+
+''' Edit latency benchmark for the onnx-graphsurgeon JSON API '''
+
+import os
+import sys
+import time
+
+root_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(root_dir)
+sys.pycache_prefix = os.path.join(root_dir, 'dist', 'pycache', 'test', 'graphsurgeon')
+gs = __import__('onnx_graphsurgeon')
+numpy = __import__('numpy')
+Model = __import__('graphsurgeon_http').Model
+
+def _graph(count):
+    ''' Chain of Add nodes, each consuming the previous output and one constant '''
+    tensor = gs.Variable('input', dtype=numpy.float32, shape=(1, 8))
+    inputs = [ tensor ]
+    nodes = []
+    for index in range(count):
+        weight = gs.Constant('weight_' + str(index), numpy.ones((1, 8), dtype=numpy.float32))
+        output = gs.Variable('output_' + str(index), dtype=numpy.float32)
+        nodes.append(gs.Node('Add', 'add_' + str(index), inputs=[ tensor, weight ],
+            outputs=[ output ]))
+        tensor = output
+    return gs.Graph(nodes=nodes, inputs=inputs, outputs=[ tensor ], opset=17)
+
+def _edits(count, repeat):
+    ''' Edits which attach, rename and detach tensors, add nodes and remove nodes mid-graph '''
+    edits = []
+    for index in range(repeat):
+        node_id = (index * 7919) % count
+        name = 'edit_' + str(index)
+        edits.extend([
+            { 'action': 'add_node_input_output', 'node_id': node_id,
+              'io_name': 'output_' + str((node_id + count - 1) % count),
+              'input_or_output': 'input' },
+            { 'action': 'change_node_input_output', 'node_id': node_id,
+              'old_name': 'weight_' + str(node_id), 'new_name': name,
+              'input_or_output': 'input' },
+            { 'action': 'change_node_input_output', 'node_id': node_id,
+              'old_name': name, 'new_name': 'weight_' + str(node_id),
+              'input_or_output': 'input' },
+            { 'action': 'add_model_input_output', 'io_name': name, 'input_or_output': 'output' },
+            { 'action': 'remove_model_input_output', 'io_name': name,
+              'input_or_output': 'output' },
+        ])
+        edits.append({ 'action': 'remove_node_input_output', 'node_id': node_id,
+            'io_name': edits[-5]['io_name'], 'input_or_output': 'input' })
+        edits.extend([
+            { 'action': 'add_node', 'node_id': count + index, 'node_name': name,
+              'node_op': 'Identity' },
+            { 'action': 'remove_node', 'node_id': node_id }
+        ])
+    return edits
+
+def _test(count, repeat=200):
+    model = Model(_graph(count))
+    edits = _edits(count, repeat)
+    start = time.perf_counter()
+    for edit in edits:
+        model.edit_batch([ edit ])
+    duration = time.perf_counter() - start
+    start = time.perf_counter()
+    while model.undo():
+        pass
+    while model.redo():
+        pass
+    journal = time.perf_counter() - start
+    start = time.perf_counter()
+    model.model.tensors()
+    scan = time.perf_counter() - start
+    print(str(count) + ' nodes: ' + format(duration * 1e6 / len(edits), '.1f') + \
+        'us per edit, ' + format(journal * 1e6 / (2 * len(edits)), '.1f') + \
+        'us per undo/redo, ' + format(scan * 1e6, '.0f') + 'us per tensor scan, ' + \
+        str(len(model.tensors)) + ' tensors')
+    tensors = model.model.tensors()
+    assert model.tensors.keys() == tensors.keys()
+    assert all(tensor is tensors[name] for name, tensor in model.tensors.items())
+
+def _test_assign(count):
+    ''' Client ID mapping in graph order, then reversed with new IDs '''
+    model = Model(_graph(count))
+    mapping = []
+    for index, node in enumerate(model.model.nodes):
+        inputs = [ tensor.name for tensor in node.inputs ]
+        outputs = [ tensor.name for tensor in node.outputs ]
+        mapping.append([ index, node.op, inputs, outputs ])
+    start = time.perf_counter()
+    model.assign_node_ids(mapping)
+    ordered = time.perf_counter() - start
+    mapping = [ [ count + entry[0] ] + entry[1:] for entry in reversed(mapping) ]
+    start = time.perf_counter()
+    model.assign_node_ids(mapping)
+    reordered = time.perf_counter() - start
+    print(str(count) + ' nodes: ' + format(ordered * 1e6 / count, '.1f') + \
+        'us per node assigned, ' + format(reordered * 1e6 / count, '.1f') + \
+        'us per node assigned in reverse order')
+    assert all(model.nodes[entry[0]].name == 'add_' + str(entry[0] - count) for entry in mapping)
+
+for _ in [ 1000, 10000, 100000 ]:
+    _test(_)
+    _test_assign(_)
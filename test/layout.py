@@ -0,0 +1,91 @@
+#!/usr/bin/env python
+
+''' Layered layout benchmark comparing the Python server layout with dagre.js '''
+
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+root_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(root_dir)
+sys.pycache_prefix = os.path.join(root_dir, 'dist', 'pycache', 'test', 'layout')
+layout = __import__('source.layout', fromlist=[ 'layout' ]).layout
+
+DAGRE_SCRIPT = '''
+const fs = require('fs');
+const grapher = require(process.argv[1]);
+const data = JSON.parse(fs.readFileSync(process.argv[2], 'utf-8'));
+const graph = new grapher.Graph(false, { nodesep: 20, ranksep: 20, ranker: 'longest-path' });
+for (let i = 0; i < data.count; i++) {
+    graph.setNode({ name: i.toString(), width: 100, height: 40 });
+}
+for (let i = 0; i < data.sources.length; i++) {
+    graph.setEdge({ v: data.sources[i].toString(), w: data.targets[i].toString() });
+}
+const start = Date.now();
+require(process.argv[3]).layout(graph);
+process.stdout.write(((Date.now() - start) / 1000).toString());
+'''
+
+def _graph(count, seed=0):
+    ''' Random graph with parallel branches, each node consumes one or two recent outputs '''
+    generator = random.Random(seed)
+    sources = []
+    targets = []
+    for index in range(1, count):
+        for _ in range(1 if index < 8 or generator.random() < 0.7 else 2):
+            sources.append(index - generator.randint(1, min(index, 8)))
+            targets.append(index)
+    return sources, targets
+
+def _crossings(rank, order, sources, targets):
+    edges = {}
+    for source, target in zip(sources, targets):
+        if rank[target] == rank[source] + 1:
+            edges.setdefault(rank[source], []).append((order[source], order[target]))
+    count = 0
+    for pairs in edges.values():
+        pairs.sort()
+        for i, (_, first) in enumerate(pairs):
+            count += sum(1 for _, second in pairs[i + 1:] if second < first)
+    return count
+
+def _test_python(count):
+    sources, targets = _graph(count)
+    start = time.time()
+    rank, order = layout(count, sources, targets)
+    duration = time.time() - start
+    crossings = _crossings(rank.tolist(), order.tolist(), sources, targets)
+    print('python ' + str(count) + ' nodes: ' + format(duration, '.2f') + 's, ' + \
+        str(int(rank.max()) + 1) + ' ranks, ' + str(crossings) + ' crossings')
+
+def _test_dagre(count, timeout=600, memory=4096):
+    sources, targets = _graph(count)
+    with tempfile.NamedTemporaryFile('w', suffix='.json', delete=False) as file:
+        json.dump({ 'count': count, 'sources': sources, 'targets': targets }, file)
+    try:
+        grapher = os.path.join(root_dir, 'source', 'grapher.js')
+        dagre = os.path.join(root_dir, 'source', 'dagre.js')
+        args = [ 'node', '--max-old-space-size=' + str(memory), '-e', DAGRE_SCRIPT, '--',
+            grapher, file.name, dagre ]
+        output = subprocess.run(args, capture_output=True, check=True, timeout=timeout, text=True)
+        print('dagre ' + str(count) + ' nodes: ' + format(float(output.stdout), '.2f') + 's')
+    except subprocess.TimeoutExpired:
+        print('dagre ' + str(count) + ' nodes: timeout after ' + str(timeout) + 's')
+    except subprocess.CalledProcessError as error:
+        if 'heap out of memory' in error.stderr:
+            print('dagre ' + str(count) + ' nodes: out of memory with ' + str(memory) + 'MB heap')
+        else:
+            print('dagre ' + str(count) + ' nodes: failed with exit code ' + str(error.returncode))
+    except OSError as error:
+        print('dagre ' + str(count) + ' nodes: ' + str(error))
+    finally:
+        os.remove(file.name)
+
+for _ in [ 1000, 10000, 100000 ]:
+    _test_python(_)
+    _test_dagre(_)